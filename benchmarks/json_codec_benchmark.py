@@ -0,0 +1,61 @@
+"""
+Data channel JSON throughput of every installed codec (see go2_webrtc_driver.json_codec).
+
+Inbound: decoding lowstate / sportmodestate text messages, as WebRTCDataChannel.on_message
+does. Outbound: encoding a sport request, as WebRTCDataChannelPubSub.publish does.
+
+    python benchmarks/json_codec_benchmark.py
+    python benchmarks/json_codec_benchmark.py --messages 20000
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from go2_webrtc_driver import json_codec
+from state_messages import make_lowstate, make_sportmodestate
+
+
+def throughput(function, payloads):
+    start = time.perf_counter()
+    for payload in payloads:
+        function(payload)
+    return len(payloads) / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=10000, help="messages per measurement")
+    args = parser.parse_args()
+
+    inbound = {
+        "lowstate": [json.dumps(make_lowstate(seed)) for seed in range(args.messages)],
+        "sportmodestate": [json.dumps(make_sportmodestate(seed)) for seed in range(args.messages)],
+    }
+    outbound = [
+        {
+            "type": "req",
+            "topic": "rt/api/sport/request",
+            "data": {
+                "header": {"identity": {"id": seed, "api_id": 1008}},
+                "parameter": json.dumps({"x": 0.5, "y": 0, "z": seed / 1000}),
+            },
+        }
+        for seed in range(args.messages)
+    ]
+
+    print(f"{'codec':<8} {'lowstate/s':>12} {'sportmode/s':>12} {'dumps/s':>12}")
+    for name in json_codec.available_codecs():
+        json_codec.set_codec(name)
+        rates = [throughput(json_codec.loads, payloads) for payloads in inbound.values()]
+        rates.append(throughput(json_codec.dumps, outbound))
+        print(f"{name:<8} " + " ".join(f"{rate:12.0f}" for rate in rates))
+
+    json_codec.set_codec("auto")
+
+
+if __name__ == "__main__":
+    main()
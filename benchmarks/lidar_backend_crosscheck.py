@@ -0,0 +1,73 @@
+"""
+Cross-check the "numpy" LidarDecoder backend against the "wasm" one.
+
+Every frame is decoded by both backends; point/face counts and the positions,
+uvs and indices arrays must match exactly. Per-frame timings are reported too.
+
+    python benchmarks/lidar_backend_crosscheck.py                 # synthetic frames
+    python benchmarks/lidar_backend_crosscheck.py --frames DIR    # recorded *.bin messages
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from go2_webrtc_driver.lidar.lidar_decoder import LidarDecoder
+from voxel_frames import load_recorded_frames, synthesize_frames
+
+
+def compare(expected, actual):
+    """Return a list of mismatch descriptions, empty when both results are identical."""
+    problems = []
+    for key in ("point_count", "face_count"):
+        if expected[key] != actual[key]:
+            problems.append(f"{key}: {expected[key]} != {actual[key]}")
+    for key in ("positions", "uvs", "indices"):
+        if expected[key].dtype != actual[key].dtype or not np.array_equal(expected[key], actual[key]):
+            problems.append(f"{key} differ")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--frames", help="directory of recorded *.bin data channel messages")
+    parser.add_argument("--count", type=int, default=20, help="number of synthetic frames")
+    args = parser.parse_args()
+
+    frames = load_recorded_frames(args.frames) if args.frames else synthesize_frames(args.count)
+
+    wasm = LidarDecoder(backend="wasm")
+    numpy_backend = LidarDecoder(backend="numpy")
+
+    timings = {"wasm": 0.0, "numpy": 0.0}
+    failures = 0
+    for number, (compressed_data, data) in enumerate(frames):
+        # The wasm module looks up neighbours past the decompressed size in its reused
+        # buffer, so clear it to compare every frame on its own
+        wasm.heap[wasm.decompressBuffer:wasm.decompressBuffer + wasm.decompressBufferSize] = 0
+
+        start = time.perf_counter()
+        expected = wasm.decode(compressed_data, data)
+        timings["wasm"] += time.perf_counter() - start
+
+        start = time.perf_counter()
+        actual = numpy_backend.decode(compressed_data, data)
+        timings["numpy"] += time.perf_counter() - start
+
+        problems = compare(expected, actual)
+        if problems:
+            failures += 1
+            print(f"frame {number}: " + ", ".join(problems))
+
+    for name, total in timings.items():
+        print(f"{name:<6} {total / max(len(frames), 1) * 1000:8.3f} ms/frame")
+    print(f"{len(frames) - failures}/{len(frames)} frames identical")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
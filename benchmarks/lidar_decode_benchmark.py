@@ -0,0 +1,76 @@
+"""
+Per-frame LidarDecoder timing, before and after the bulk memory copies.
+
+The "legacy" decoder restores the original element-wise Python loops for the
+input copy and the `b` (memory region copy) wasm import, so both variants run
+against the same wasm module and the same frames.
+
+    python benchmarks/lidar_decode_benchmark.py                 # synthetic frames
+    python benchmarks/lidar_decode_benchmark.py --frames DIR    # recorded *.bin messages
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from go2_webrtc_driver.lidar.lidar_decoder import LidarDecoder
+from voxel_frames import load_recorded_frames, synthesize_frames
+
+
+class LegacyLidarDecoder(LidarDecoder):
+    def copy_within(self, target, start, end):
+        sublist = self.HEAPU8[start:end]
+        for i in range(len(sublist)):
+            if target + i < len(self.HEAPU8):
+                self.HEAPU8[target + i] = sublist[i]
+
+    def add_value_arr(self, start, value):
+        if start + len(value) <= len(self.HEAPU8):
+            for i, byte in enumerate(value):
+                self.HEAPU8[start + i] = byte
+        else:
+            raise ValueError("Not enough space to insert bytes at the specified index.")
+
+
+def run(decoder, frames, repeat):
+    # Warm up once so one-off allocations do not skew the first frame
+    decoder.decode(*frames[0])
+
+    timings = []
+    for _ in range(repeat):
+        for compressed_data, data in frames:
+            start = time.perf_counter()
+            decoder.decode(compressed_data, data)
+            timings.append(time.perf_counter() - start)
+    timings.sort()
+    return timings
+
+
+def report(name, timings):
+    mean = sum(timings) / len(timings)
+    median = timings[len(timings) // 2]
+    print(f"{name:<10} mean {mean * 1000:8.3f} ms   median {median * 1000:8.3f} ms   ({len(timings)} frames)")
+    return mean
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--frames", help="directory of recorded *.bin data channel messages")
+    parser.add_argument("--count", type=int, default=20, help="number of synthetic frames")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    frames = load_recorded_frames(args.frames) if args.frames else synthesize_frames(args.count)
+    if not frames:
+        print("No frames to decode")
+        return
+
+    legacy = report("legacy", run(LegacyLidarDecoder(), frames, args.repeat))
+    current = report("current", run(LidarDecoder(), frames, args.repeat))
+    print(f"speedup    {legacy / current:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Representative `rt/lf/lowstate` and `rt/lf/sportmodestate` data channel messages.
+
+`make_lowstate(seed)` and `make_sportmodestate(seed)` return the decoded message dicts
+with the same layout and value ranges the robot sends, so benchmarks do not need a live
+connection.
+"""
+import random
+
+
+def make_lowstate(seed=0):
+    rng = random.Random(seed)
+    return {
+        "type": "msg",
+        "topic": "rt/lf/lowstate",
+        "data": {
+            "imu_state": {"rpy": [rng.uniform(-0.1, 0.1) for _ in range(3)]},
+            "motor_state": [
+                {
+                    "q": rng.uniform(-2.5, 2.5),
+                    "temperature": rng.randint(25, 60),
+                    "lost": rng.randint(0, 3),
+                    "reserve": [0, rng.randint(0, 600)],
+                }
+                for _ in range(20)
+            ],
+            "bms_state": {
+                "version_high": 1,
+                "version_low": 18,
+                "status": 8,
+                "soc": rng.randint(5, 100),
+                "current": rng.randint(-9000, 2000),
+                "cycle": rng.randint(0, 400),
+                "bq_ntc": [rng.randint(25, 40), rng.randint(25, 40)],
+                "mcu_ntc": [rng.randint(25, 40), rng.randint(25, 40)],
+            },
+            "foot_force": [rng.randint(0, 150) for _ in range(4)],
+            "temperature_ntc1": rng.randint(30, 60),
+            "power_v": rng.uniform(24.0, 33.6),
+        },
+    }
+
+
+def make_sportmodestate(seed=0):
+    rng = random.Random(seed)
+    return {
+        "type": "msg",
+        "topic": "rt/lf/sportmodestate",
+        "data": {
+            "stamp": {"sec": 1700000000 + seed, "nanosec": rng.randint(0, 999999999)},
+            "error_code": 0,
+            "imu_state": {
+                "quaternion": [rng.uniform(-1, 1) for _ in range(4)],
+                "gyroscope": [rng.uniform(-1, 1) for _ in range(3)],
+                "accelerometer": [rng.uniform(-10, 10) for _ in range(3)],
+                "rpy": [rng.uniform(-0.1, 0.1) for _ in range(3)],
+                "temperature": rng.randint(30, 60),
+            },
+            "mode": 1,
+            "progress": 0.0,
+            "gait_type": 1,
+            "foot_raise_height": 0.09,
+            "position": [rng.uniform(-5, 5) for _ in range(3)],
+            "body_height": 0.32,
+            "velocity": [rng.uniform(-1, 1) for _ in range(3)],
+            "yaw_speed": rng.uniform(-1, 1),
+            "range_obstacle": [rng.uniform(0, 5) for _ in range(4)],
+            "foot_force": [rng.randint(0, 150) for _ in range(4)],
+            "foot_position_body": [rng.uniform(-0.3, 0.3) for _ in range(12)],
+            "foot_speed_body": [rng.uniform(-1, 1) for _ in range(12)],
+        },
+    }
@@ -0,0 +1,117 @@
+"""
+Cost of handling lowstate / sportmodestate messages as plain dicts versus typed states.
+
+Every variant decodes the JSON text and then reads the fields a typical consumer reads:
+all motor positions and temperatures, IMU rpy and the foot forces. The variants are
+
+    dict:      json_codec.loads, what untyped subscribers get
+    typed:     state_types.message_decoder, straight from the text into typed states,
+               what typed subscribers get when every subscriber of the topic is typed
+    converted: json_codec.loads and then conversion of the dict, what typed subscribers
+               get when other subscribers of the topic need the dict too
+
+Reported are decode + read throughput (best of --repeat runs) and the memory retained per
+state by a consumer keeping the last 1000 states.
+
+    python benchmarks/state_types_benchmark.py
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import msgspec
+
+from go2_webrtc_driver import json_codec
+from go2_webrtc_driver.constants import RTC_TOPIC
+from go2_webrtc_driver.msgs.state_types import LowState, SportModeState, message_decoder
+from state_messages import make_lowstate, make_sportmodestate
+
+
+def read_lowstate_dict(data):
+    q = [motor["q"] for motor in data["motor_state"]]
+    temperature = max(motor["temperature"] for motor in data["motor_state"])
+    return q, temperature, data["imu_state"]["rpy"][2], sum(data["foot_force"])
+
+
+def read_lowstate_typed(state):
+    q = [motor.q for motor in state.motor_state]
+    temperature = max(motor.temperature for motor in state.motor_state)
+    return q, temperature, state.imu_state.rpy[2], sum(state.foot_force)
+
+
+def read_sportmodestate_dict(data):
+    return data["position"], data["imu_state"]["rpy"][2], data["foot_position_body"][0:3], data["velocity"][0]
+
+
+def read_sportmodestate_typed(state):
+    return state.position, state.imu_state.rpy[2], state.foot_position_body[0:3], state.velocity[0]
+
+
+def dict_variant(read):
+    def decode(payload):
+        return json_codec.loads(payload)["data"]
+    return decode, read
+
+
+def typed_variant(topic, read):
+    decode_message = message_decoder(topic)
+
+    def decode(payload):
+        return decode_message(payload)["data"]
+    return decode, read
+
+
+def converted_variant(state_type, read):
+    def decode(payload):
+        return msgspec.convert(json_codec.loads(payload)["data"], state_type)
+    return decode, read
+
+
+def measure(decode, read, payloads, repeat):
+    elapsed = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for payload in payloads:
+            read(decode(payload))
+        elapsed = min(elapsed, time.perf_counter() - start)
+
+    tracemalloc.start()
+    states = [decode(payload) for payload in payloads[:1000]]
+    retained, _peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del states
+    return len(payloads) / elapsed, retained / 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    lowstate = [json.dumps(make_lowstate(seed)) for seed in range(args.messages)]
+    sportmodestate = [json.dumps(make_sportmodestate(seed)) for seed in range(args.messages)]
+    low_topic = RTC_TOPIC["LOW_STATE"]
+    sport_topic = RTC_TOPIC["LF_SPORT_MOD_STATE"]
+
+    print(f"codec: {json_codec.codec}")
+    print(f"{'variant':<26} {'msgs/s':>10} {'bytes/state':>12}")
+    for name, (decode, read), payloads in (
+        ("lowstate dict", dict_variant(read_lowstate_dict), lowstate),
+        ("lowstate typed", typed_variant(low_topic, read_lowstate_typed), lowstate),
+        ("lowstate converted", converted_variant(LowState, read_lowstate_typed), lowstate),
+        ("sportmodestate dict", dict_variant(read_sportmodestate_dict), sportmodestate),
+        ("sportmodestate typed", typed_variant(sport_topic, read_sportmodestate_typed), sportmodestate),
+        ("sportmodestate converted", converted_variant(SportModeState, read_sportmodestate_typed), sportmodestate),
+    ):
+        rate, size = measure(decode, read, payloads, args.repeat)
+        print(f"{name:<26} {rate:10.0f} {size:12.0f}")
+
+
+if __name__ == "__main__":
+    main()
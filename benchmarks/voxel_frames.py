@@ -0,0 +1,62 @@
+"""Helpers to load recorded or synthesize compressed voxel map frames for the lidar benchmarks."""
+import glob
+import json
+import os
+import struct
+
+import numpy as np
+
+
+def split_frame(buffer):
+    """Split a raw binary data channel message into (compressed bytes, header data dict)."""
+    header_1, header_2 = struct.unpack_from('<HH', buffer, 0)
+    if header_1 == 2 and header_2 == 0:
+        buffer = buffer[4:]
+        header_length, = struct.unpack_from('<I', buffer, 0)
+        json_data = buffer[8:8 + header_length]
+        binary_data = buffer[8 + header_length:]
+    else:
+        header_length, = struct.unpack_from('<H', buffer, 0)
+        json_data = buffer[4:4 + header_length]
+        binary_data = buffer[4 + header_length:]
+    return bytes(binary_data), json.loads(json_data.decode('utf-8'))['data']
+
+
+def load_recorded_frames(path):
+    """Load every *.bin file in `path`, each holding one raw binary data channel message."""
+    frames = []
+    for file_name in sorted(glob.glob(os.path.join(path, "*.bin"))):
+        with open(file_name, "rb") as file:
+            frames.append(split_frame(file.read()))
+    return frames
+
+
+def synthesize_frames(count, seed=0):
+    """Build `count` LZ4-compressed 128x128x30 voxel maps (requires the `lz4` package)."""
+    import lz4.block
+
+    rng = np.random.default_rng(seed)
+    frames = []
+    for _ in range(count):
+        occupancy = np.zeros((30, 128, 128), dtype=bool)
+
+        # Uneven ground, two walls, dense clutter up to the top of the map and sparse noise
+        ground = rng.integers(0, 3, size=(128, 128))
+        for z in range(3):
+            occupancy[z][ground >= z] = True
+        occupancy[3:25, 10, :] = True
+        occupancy[3:25, :, 100] = True
+        occupancy[26:30, 30:, :] |= rng.random((4, 98, 128)) < 0.5
+        occupancy |= rng.random(occupancy.shape) < 0.01
+
+        bitmap = np.packbits(occupancy.reshape(-1)).tobytes()
+        header = {
+            "stamp": 0.0,
+            "frame_id": "odom",
+            "resolution": 0.05,
+            "src_size": len(bitmap),
+            "origin": [-3.2, -3.2, -0.575],
+            "width": [128, 128, 38],
+        }
+        frames.append((lz4.block.compress(bitmap, store_size=False), header))
+    return frames
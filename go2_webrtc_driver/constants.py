@@ -107,6 +107,16 @@ RTC_TOPIC = {
     "MOTION_SWITCHER": "rt/api/motion_switcher/request"
 }
 
+# Topics the client publishes on (API requests and commands) rather than the robot;
+# topic patterns never subscribe them, see WebRTCDataChannelPubSub.robot_topics()
+CLIENT_TOPICS = frozenset(
+    topic for name, topic in RTC_TOPIC.items()
+    if topic.endswith("/request") or name in (
+        "ULIDAR_SWITCH", "LOW_CMD", "WIRELESS_CONTROLLER", "SLAM_QT_COMMAND", "SLAM_ADD_NODE",
+        "SLAM_ADD_EDGE", "ARM_COMMAND", "LIDAR_MAPPING_CMD", "PROGRAMMING_ACTUATOR_CMD",
+    )
+)
+
 SPORT_CMD = {
     "Damp": 1001,
     "BalanceStand": 1002,
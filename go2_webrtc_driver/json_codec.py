@@ -0,0 +1,127 @@
+"""
+JSON codec used for data channel traffic.
+
+The fastest available implementation is picked at import time: orjson, then msgspec,
+then the standard library. Override it with the GO2_JSON_CODEC environment variable
+("orjson", "msgspec", "json" or "auto") or at runtime with set_codec().
+
+Use the module attributes, not from-imports, so set_codec() takes effect everywhere:
+
+    from . import json_codec
+    json_codec.loads(payload)   # str, bytes, bytearray or memoryview
+    json_codec.dumps(obj)       # always returns str
+
+Outgoing messages are the same JSON with every codec, but not the same text: orjson and
+msgspec write compact separators (no space after "," and ":") where json.dumps writes
+", " and ": ", and they encode NaN and infinities as null where json.dumps writes the
+non-standard NaN and Infinity literals. Select the "json" codec to send byte-identical
+messages to earlier versions.
+
+Incoming messages decode the same with every codec: orjson and msgspec reject the NaN and
+Infinity literals json.loads accepts, so text they cannot decode is retried with json.loads
+(see fallback_loads()), and only raises DecodeError if that fails too.
+"""
+import json
+import logging
+import os
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+CODECS = ("orjson", "msgspec", "json")
+DEFAULT_CODEC = os.environ.get("GO2_JSON_CODEC", "auto")
+
+# Exceptions raised by loads() for malformed input, whatever the codec (orjson's is a json.JSONDecodeError)
+DecodeError = (json.JSONDecodeError, UnicodeDecodeError) + ((msgspec.DecodeError,) if msgspec is not None else ())
+
+
+def _json_loads(data):
+    if isinstance(data, memoryview):
+        data = data.tobytes()
+    return json.loads(data)
+
+
+def _json_dumps(obj):
+    return json.dumps(obj)
+
+
+def fallback_loads(decode):
+    """`decode`, retried with json.loads when it rejects the input (e.g. NaN literals)."""
+    def loads(data):
+        try:
+            return decode(data)
+        except DecodeError:
+            return _json_loads(data)
+    return loads
+
+
+if orjson is not None:
+    # Keys like integer ids are converted like json.dumps does; numpy arrays become lists
+    ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+    def _orjson_dumps(obj):
+        try:
+            return orjson.dumps(obj, option=ORJSON_OPTIONS).decode("utf-8")
+        except TypeError:
+            # e.g. integers wider than 64 bits
+            return json.dumps(obj)
+
+if msgspec is not None:
+    _msgspec_encoder = msgspec.json.Encoder()
+    _msgspec_decoder = msgspec.json.Decoder()
+
+    def _msgspec_dumps(obj):
+        try:
+            return _msgspec_encoder.encode(obj).decode("utf-8")
+        except (TypeError, msgspec.EncodeError):
+            return json.dumps(obj)
+
+
+def available_codecs():
+    available = []
+    if orjson is not None:
+        available.append("orjson")
+    if msgspec is not None:
+        available.append("msgspec")
+    available.append("json")
+    return available
+
+
+def set_codec(name="auto"):
+    """Select the codec used by loads() and dumps(); "auto" picks the fastest one installed."""
+    global codec, loads, dumps
+
+    if name == "auto":
+        name = available_codecs()[0]
+    if name not in CODECS:
+        raise ValueError(f"Unknown JSON codec: {name}")
+    if name not in available_codecs():
+        raise ImportError(f"JSON codec {name} is not installed")
+
+    if name == "orjson":
+        loads, dumps = fallback_loads(orjson.loads), _orjson_dumps
+    elif name == "msgspec":
+        loads, dumps = fallback_loads(_msgspec_decoder.decode), _msgspec_dumps
+    else:
+        loads, dumps = _json_loads, _json_dumps
+    codec = name
+    logging.debug("Using JSON codec %s", name)
+    return name
+
+
+codec = None
+loads = _json_loads
+dumps = _json_dumps
+
+try:
+    set_codec(DEFAULT_CODEC)
+except (ValueError, ImportError):
+    logging.warning("JSON codec %s is not available, using auto-selection", DEFAULT_CODEC)
+    set_codec("auto")
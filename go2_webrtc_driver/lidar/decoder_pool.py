@@ -0,0 +1,112 @@
+import asyncio
+import collections
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+# Frames submitted but not delivered yet, before the oldest undecoded one is dropped
+DEFAULT_MAX_IN_FLIGHT = 8
+
+# Decode function of the current worker process, set by the pool initializer
+_worker_decode = None
+
+
+def _init_worker(decode_fn, warmup_fn):
+    global _worker_decode
+    _worker_decode = decode_fn
+    if warmup_fn is not None:
+        warmup_fn()
+
+
+def _decode_in_worker(buffer):
+    return _worker_decode(buffer)
+
+
+class LidarDecoderPool:
+    """
+    Decodes binary data channel messages in a pool of worker processes.
+
+    Every worker is a separate process with its own wasmtime Store and LidarDecoder, so
+    several voxel maps can be decoded in parallel while the asyncio event loop stays free.
+    Results are handed to the callback in the order the buffers were submitted.
+    `warmup_fn` runs once in every worker at startup, e.g. to create its decoder.
+
+    At most `max_in_flight` frames wait for decoding or delivery. When frames arrive faster
+    than the workers decode them, the oldest frame still waiting is dropped (cancelled if
+    no worker picked it up yet) and counted in `dropped`, so memory and latency stay bounded.
+    """
+
+    def __init__(self, decode_fn, workers=2, warmup_fn=None, max_in_flight=DEFAULT_MAX_IN_FLIGHT):
+        if max_in_flight < 1:
+            raise ValueError("max_in_flight must be at least 1")
+        self.workers = workers
+        self.max_in_flight = max_in_flight
+        # "spawn" so workers never inherit a wasmtime Store created in the parent process
+        self.executor = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(decode_fn, warmup_fn),
+        )
+        self.pending = collections.deque()  # [future, callback], callback None once dropped
+        self.in_flight = 0
+        self.submitted = 0
+        self.dropped = 0
+
+    def submit(self, buffer, callback):
+        """Queue a buffer for decoding; callback(result) is called from the event loop."""
+        if self.in_flight >= self.max_in_flight:
+            self._drop_oldest()
+        loop = asyncio.get_event_loop()
+        future = loop.run_in_executor(self.executor, _decode_in_worker, buffer)
+        self.pending.append([future, callback])
+        self.in_flight += 1
+        self.submitted += 1
+        future.add_done_callback(self._deliver_ready)
+
+    def _drop_oldest(self):
+        for entry in self.pending:
+            if entry[1] is not None:
+                entry[1] = None
+                entry[0].cancel()
+                self.in_flight -= 1
+                self.dropped += 1
+                return
+
+    async def decode(self, buffer):
+        """Decode a single buffer in a worker, outside of the ordered submit() queue."""
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(self.executor, _decode_in_worker, buffer)
+
+    def _deliver_ready(self, _future):
+        # Only deliver from the head of the queue to keep the arrival order
+        while self.pending and self.pending[0][0].done():
+            future, callback = self.pending.popleft()
+            if callback is None:
+                continue
+            self.in_flight -= 1
+            if future.cancelled():
+                continue
+            try:
+                result = future.result()
+            except Exception:
+                logging.error("Failed to decode lidar data in worker", exc_info=True)
+                continue
+            callback(result)
+
+    def close(self):
+        """Stop the workers and drop frames that were not decoded yet."""
+        for future, _callback in self.pending:
+            future.cancel()
+        self.pending.clear()
+        self.in_flight = 0
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self):
+        return {
+            "workers": self.workers,
+            "in_flight": self.in_flight,
+            "max_in_flight": self.max_in_flight,
+            "submitted": self.submitted,
+            "dropped": self.dropped,
+        }
@@ -21,23 +21,197 @@
 
 import math
 import ctypes
+import hashlib
+import logging
 import numpy as np
 import os
+from importlib import metadata
 
-from wasmtime import Config, Engine, Store, Module, Instance, Func, FuncType
-from wasmtime import ValType
+from .voxel_numpy import NumpyVoxelDecoder, voxel_coordinates
+
+WASM_PATH = os.path.join(os.path.dirname(__file__), "libvoxel.wasm")
+
+# Precompiled modules are cached here; set GO2_WASM_CACHE_DIR to "" to disable the cache
+DEFAULT_MODULE_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "go2_webrtc_driver")
+
+# "wasm" runs libvoxel.wasm through wasmtime, "numpy" uses the pure NumPy reimplementation
+BACKENDS = ("wasm", "numpy")
+
+WASM_PAGE_SIZE = 65536
+
+# Initial wasm buffer sizes; they grow on demand for larger or denser frames
+INITIAL_INPUT_SIZE = 61440
+INITIAL_DECOMPRESS_SIZE = 80000
+INITIAL_FACE_CAPACITY = 240000
+
+# Retries with larger buffers before a frame is given up on
+MAX_DECODE_ATTEMPTS = 4
+
+# LZ4 expands data at most this much, which bounds the decompressed size of a frame
+LZ4_MAX_RATIO = 255
+DEFAULT_BACKEND = os.environ.get("GO2_LIDAR_BACKEND", "wasm")
+
+
+def module_cache_key(wasm_bytes, config_flags):
+    """Key a precompiled module by the wasm contents, the wasmtime version and the engine config."""
+    try:
+        wasmtime_version = metadata.version("wasmtime")
+    except metadata.PackageNotFoundError:
+        wasmtime_version = "unknown"
+
+    digest = hashlib.sha256(wasm_bytes)
+    digest.update(wasmtime_version.encode("utf-8"))
+    digest.update(config_flags.encode("utf-8"))
+    return digest.hexdigest()
+
+
+def private_cache_dir(cache_dir):
+    """
+    Create the module cache directory readable by the current user only, and check that
+    nobody else can write to it; returns False if they can, so the cache is not used.
+    """
+    os.makedirs(cache_dir, mode=0o700, exist_ok=True)
+    if not hasattr(os, "getuid"):
+        return True
+    status = os.stat(cache_dir)
+    if status.st_uid != os.getuid() or status.st_mode & 0o022:
+        logging.warning("Not using module cache %s: it is writable by other users", cache_dir)
+        return False
+    return True
+
+
+def read_verified(cache_path):
+    """
+    The serialized module in `cache_path` if its SHA-256 matches the digest stored next to
+    it when it was written, otherwise None. Deserializing runs native code, so a module
+    that was modified or only partially written is never loaded.
+    """
+    try:
+        with open(cache_path, "rb") as file:
+            serialized = file.read()
+        with open(f"{cache_path}.sha256", "r", encoding="ascii") as file:
+            expected = file.read().strip()
+    except OSError:
+        return None
+    if hashlib.sha256(serialized).hexdigest() != expected:
+        logging.warning("Ignoring precompiled module %s: its digest does not match", cache_path)
+        return None
+    return serialized
+
+
+def write_atomic(path, data):
+    # Write to a temporary file first so concurrent processes never read a partial file
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, "wb") as file:
+        file.write(data)
+    os.replace(tmp_path, path)
+
+
+def load_module(engine, wasm_path=WASM_PATH, config_flags=""):
+    """
+    Load a wasm module, reusing a serialized precompiled copy from the on-disk cache
+    when one exists for this wasm file, wasmtime version and engine config. Cached copies
+    are only deserialized from a directory no other user can write to, and only when their
+    SHA-256 matches the digest written along with them.
+    """
+    from wasmtime import Module
+
+    with open(wasm_path, "rb") as file:
+        wasm_bytes = file.read()
+
+    cache_dir = os.environ.get("GO2_WASM_CACHE_DIR", DEFAULT_MODULE_CACHE_DIR)
+    if not cache_dir:
+        return Module(engine, wasm_bytes)
+
+    try:
+        if not private_cache_dir(cache_dir):
+            return Module(engine, wasm_bytes)
+    except OSError:
+        logging.warning("Could not create module cache %s", cache_dir, exc_info=True)
+        return Module(engine, wasm_bytes)
+
+    name = os.path.splitext(os.path.basename(wasm_path))[0]
+    cache_path = os.path.join(cache_dir, f"{name}-{module_cache_key(wasm_bytes, config_flags)[:32]}.cwasm")
+
+    serialized = read_verified(cache_path)
+    if serialized is not None:
+        try:
+            # Deserialized from the bytes that were verified, not by reopening the file
+            return Module.deserialize(engine, serialized)
+        except Exception:
+            logging.warning("Ignoring unusable precompiled module %s", cache_path, exc_info=True)
+
+    module = Module(engine, wasm_bytes)
+
+    try:
+        serialized = module.serialize()
+        # The module first, so a digest never vouches for a module not fully written yet
+        write_atomic(cache_path, serialized)
+        write_atomic(f"{cache_path}.sha256", hashlib.sha256(serialized).hexdigest().encode("ascii"))
+    except OSError:
+        logging.warning("Could not write precompiled module cache %s", cache_path, exc_info=True)
+
+    return module
+
+
+def positions_to_points(positions, origin, resolution, dedup=False):
+    """
+    Convert decoded uint8 mesh vertex positions into an (N, 3) float32 array of world-frame
+    points: origin + voxel coordinates * resolution. With dedup=True every vertex shared by
+    several faces is returned once (ordered by z, y, x).
+    """
+    vertices = positions.reshape(-1, 3)
+    if dedup:
+        # Pack x, y, z into one integer key so uniqueness is a 1-D operation
+        keys = vertices[:, 0].astype(np.uint32) | (vertices[:, 1].astype(np.uint32) << 8) | (vertices[:, 2].astype(np.uint32) << 16)
+        keys = np.unique(keys)
+        vertices = np.stack([keys & 0xFF, (keys >> 8) & 0xFF, keys >> 16], axis=1)
+
+    points = vertices.astype(np.float32)
+    points *= np.float32(resolution)
+    points += np.asarray(origin, dtype=np.float32)
+    return points
 
 
 class LidarDecoder:
-    def __init__(self) -> None:
+    def __init__(self, backend=None) -> None:
+        self.backend = backend or DEFAULT_BACKEND
+        if self.backend not in BACKENDS:
+            raise ValueError(f"Unknown lidar decoder backend: {self.backend}")
+
+        if self.backend == "numpy":
+            # No wasm runtime at all, so wasmtime does not even need to be installed
+            self.numpy_decoder = NumpyVoxelDecoder()
+            return
+
+        # Imported here so the numpy backend works without wasmtime
+        from wasmtime import Config, Engine, Trap, WasmtimeError
+
+        self.trap_errors = (Trap, WasmtimeError)
 
         config = Config()
         config.wasm_multi_value = True
-        config.debug_info = True
-        self.store = Store(Engine(config))
+        self.engine = Engine(config)
+
+        self.module = load_module(self.engine, WASM_PATH, config_flags="wasm_multi_value")
+
+        # Buffer capacities grow on demand and are kept across frames
+        self.capacity = {
+            "input": INITIAL_INPUT_SIZE,
+            "decompress": INITIAL_DECOMPRESS_SIZE,
+            "faces": INITIAL_FACE_CAPACITY,
+        }
+        # Largest input, decompressed size and face count seen so far
+        self.high_water = {"input": 0, "decompressed": 0, "faces": 0}
 
-        wasm_path = os.path.join(os.path.dirname(__file__), "libvoxel.wasm")
-        self.module = Module.from_file(self.store.engine, wasm_path)
+        self.instantiate()
+
+    def instantiate(self):
+        """(Re)create the wasm instance in a fresh Store and allocate all buffers."""
+        from wasmtime import Store, Instance, Func, FuncType, ValType
+
+        self.store = Store(self.engine)
 
         self.a_callback_type = FuncType([ValType.i32()], [ValType.i32()])
         self.b_callback_type = FuncType([ValType.i32(), ValType.i32(), ValType.i32()], [])
@@ -52,10 +226,27 @@ class LidarDecoder:
         self.free = self.instance.exports(self.store)["g"]
         self.wasm_memory = self.instance.exports(self.store)["c"]
 
+        self.memory_size = 0
+        self.refresh_heap_views()
+
+        self.decompressedSize = self.allocate(4)
+        self.faceCount = self.allocate(4)
+        self.pointCount = self.allocate(4)
+        self.input = self.allocate(self.capacity["input"])
+        self.decompressBuffer = self.allocate(self.capacity["decompress"])
+        self.decompressBufferSize = self.capacity["decompress"]
+        self.allocate_mesh_buffers(self.capacity["faces"])
+
+    def refresh_heap_views(self):
+        """Rebuild the HEAP* views if the wasm memory moved or grew since they were created."""
         self.buffer = self.wasm_memory.data_ptr(self.store)
-        self.memory_size = self.wasm_memory.data_len(self.store)
+        buffer_ptr = int.from_bytes(self.buffer, "little")
+        memory_size = self.wasm_memory.data_len(self.store)
+        if buffer_ptr == getattr(self, "buffer_ptr", None) and memory_size == self.memory_size:
+            return
 
-        self.buffer_ptr = int.from_bytes(self.buffer, "little")
+        self.buffer_ptr = buffer_ptr
+        self.memory_size = memory_size
 
         self.HEAP8 = (ctypes.c_int8 * self.memory_size).from_address(self.buffer_ptr)
         self.HEAP16 = (ctypes.c_int16 * (self.memory_size // 2)).from_address(self.buffer_ptr)
@@ -66,27 +257,97 @@ class LidarDecoder:
         self.HEAPF32 = (ctypes.c_float * (self.memory_size // 4)).from_address(self.buffer_ptr)
         self.HEAPF64 = (ctypes.c_double * (self.memory_size // 8)).from_address(self.buffer_ptr)
 
-        self.input = self.malloc(self.store, 61440)
-        self.decompressBuffer = self.malloc(self.store, 80000)
-        self.positions = self.malloc(self.store, 2880000)
-        self.uvs = self.malloc(self.store, 1920000)
-        self.indices = self.malloc(self.store, 5760000)
-        self.decompressedSize = self.malloc(self.store, 4)
-        self.faceCount = self.malloc(self.store, 4)
-        self.pointCount = self.malloc(self.store, 4)
-        self.decompressBufferSize = 80000
+        # NumPy view over the same linear memory, used for bulk copies in and out of wasm
+        self.heap = np.frombuffer(self.HEAPU8, dtype=np.uint8)
+
+    def allocate(self, size):
+        pointer = self.malloc(self.store, size)
+        # malloc may have grown the memory through adjust_memory_size
+        self.refresh_heap_views()
+        if not pointer:
+            raise MemoryError(f"libvoxel.wasm could not allocate {size} bytes")
+        return pointer
+
+    def allocate_mesh_buffers(self, faces):
+        self.positions = self.allocate(faces * 12)
+        self.uvs = self.allocate(faces * 8)
+        self.indices = self.allocate(faces * 24)
+
+    def ensure_capacity(self, kind, size):
+        """Grow the `kind` buffer(s) so they hold at least `size` (bytes, or faces for "faces")."""
+        previous = self.capacity[kind]
+        if size <= previous:
+            return
+
+        # Grow geometrically so a slowly increasing frame size does not reallocate every
+        # time, but fall back to the exact size when that does not fit in the wasm memory
+        for capacity in dict.fromkeys((max(size, previous * 3 // 2), size)):
+            self.capacity[kind] = capacity
+            try:
+                self.reallocate(kind)
+                return
+            except MemoryError:
+                # The old buffers are already freed, so start again from a clean instance
+                self.capacity[kind] = previous
+                self.instantiate()
+        raise MemoryError(f"libvoxel.wasm memory is too small for a {kind} buffer of {size}")
+
+    def reallocate(self, kind):
+        if kind == "input":
+            self.free(self.store, self.input)
+            self.input = self.allocate(self.capacity["input"])
+        elif kind == "decompress":
+            self.free(self.store, self.decompressBuffer)
+            self.decompressBuffer = self.allocate(self.capacity["decompress"])
+            self.decompressBufferSize = self.capacity["decompress"]
+        else:
+            for pointer in (self.positions, self.uvs, self.indices):
+                self.free(self.store, pointer)
+            self.allocate_mesh_buffers(self.capacity["faces"])
+
+    def rebuild(self, faces):
+        """Start over in a fresh instance with room for `faces` faces; False if that does not fit."""
+        previous = self.capacity["faces"]
+        self.capacity["faces"] = faces
+        try:
+            self.instantiate()
+            return True
+        except MemoryError:
+            self.capacity["faces"] = previous
+            self.instantiate()
+            return False
+
+    def buffer_stats(self):
+        """Current buffer capacities and the high-water marks of the decoded frames."""
+        return {
+            "capacity": dict(self.capacity),
+            "high_water": dict(self.high_water),
+            "memory_size": self.memory_size,
+        }
 
     def adjust_memory_size(self, t):
-        return len(self.HEAPU8)
+        # emscripten_resize_heap: grow the linear memory to at least `t` bytes, 0 on failure
+        requested = t & 0xFFFFFFFF
+        current = self.wasm_memory.data_len(self.store)
+        if requested <= current:
+            return 1
+        pages = (requested - current + WASM_PAGE_SIZE - 1) // WASM_PAGE_SIZE
+        try:
+            self.wasm_memory.grow(self.store, pages)
+        except Exception:
+            return 0
+        self.refresh_heap_views()
+        return 1
 
     def copy_within(self, target, start, end):
-        # Copy the sublist for the specified range [start:end]
-        sublist = self.HEAPU8[start:end]
-
-        # Replace elements in the list starting from index 'target'
-        for i in range(len(sublist)):
-            if target + i < len(self.HEAPU8):
-                self.HEAPU8[target + i] = sublist[i]
+        # Same semantics as the old element-wise loop: the source range is clipped to the
+        # heap and the copy stops at the end of the heap, but done as one memmove.
+        heap_size = len(self.HEAPU8)
+        count = min(end, heap_size) - start
+        count = min(count, heap_size - target)
+        if count <= 0 or start < 0 or target < 0:
+            return
+        ctypes.memmove(self.buffer_ptr + target, self.buffer_ptr + start, count)
     
     def copy_memory_region(self, t, n, a):
         self.copy_within(t, n, n + a)
@@ -110,47 +371,211 @@ class LidarDecoder:
             raise ValueError(f"invalid type for getValue: {n}")
         
     def add_value_arr(self, start, value):
-        if start + len(value) <= len(self.HEAPU8):
-            for i, byte in enumerate(value):
-                self.HEAPU8[start + i] = byte
+        size = len(value)
+        if start + size <= len(self.HEAPU8):
+            # Single bulk copy instead of a per-byte Python loop
+            self.heap[start:start + size] = np.frombuffer(value, dtype=np.uint8)
         else:
             raise ValueError("Not enough space to insert bytes at the specified index.")
 
-    def decode(self, compressed_data, data):
-        self.add_value_arr(self.input, compressed_data)
+    def decode(self, compressed_data, data, out=None, copy=True, output="mesh", dedup=False):
+        """
+        Decode a compressed voxel map.
+
+        By default the returned arrays are independent copies. With copy=False they are
+        NumPy views straight over the wasm memory, only valid until the next decode call.
+        If `out` is a dict with "positions", "uvs" and "indices" arrays, the results are
+        copied into those (reusable) arrays and the returned arrays are slices of them.
+
+        With output="points" the mesh is not returned; instead "points" holds the mesh
+        vertices as an (N, 3) float32 array in the world frame, using "origin" and
+        "resolution" from the frame header (`data`). dedup=True drops shared vertices.
+
+        With output="voxels" the result holds "voxels", the (N, 3) int32 x, y, z grid
+        coordinates of the occupied voxels (see decode_voxels).
+        """
+        if output == "voxels":
+            voxels = self.decode_voxels(compressed_data, data)
+            return {
+                "point_count": len(voxels),
+                "voxels": voxels
+            }
+        elif output == "points":
+            result = self.decode_mesh(compressed_data, data, copy=False)
+            return {
+                "point_count": result["point_count"],
+                "face_count": result["face_count"],
+                "points": positions_to_points(result["positions"], data["origin"], data["resolution"], dedup)
+            }
+        elif output != "mesh":
+            raise ValueError(f"Unknown lidar output mode: {output}")
+
+        return self.decode_mesh(compressed_data, data, out=out, copy=copy)
+
+    def decode_many(self, frames, output="mesh", dedup=False, expected_faces=0):
+        """
+        Decode a list or iterator of (compressed bytes, header data) pairs into stacked arrays.
+
+        For output="mesh" the result holds the "positions", "uvs" and "indices" of all frames
+        back to back, plus "face_offsets" (frame i owns faces face_offsets[i]:face_offsets[i+1])
+        and "point_counts". Indices stay relative to their own frame; add 4 * face_offsets[i]
+        to address the stacked positions. For output="points" the result holds the stacked
+        (N, 3) float32 "points" and "point_offsets" instead, for output="voxels" the stacked
+        "voxels" and "voxel_offsets".
+
+        The stacked arrays are preallocated for `expected_faces` faces and grow geometrically,
+        so every frame is copied exactly once out of the decoder.
+        """
+        # Stacked arrays are kept as rows (one per face, or one per point) while decoding
+        if output == "mesh":
+            row_shapes = {"positions": (12, np.uint8), "uvs": (8, np.uint8), "indices": (6, np.uint32)}
+            capacity = max(int(expected_faces), 1)
+        elif output == "points":
+            row_shapes = {"points": (3, np.float32)}
+            capacity = max(int(expected_faces) * 4, 1)
+        elif output == "voxels":
+            row_shapes = {"voxels": (3, np.int32)}
+            capacity = max(int(expected_faces), 1)
+        else:
+            raise ValueError(f"Unknown lidar output mode: {output}")
+
+        stacked = {key: np.empty((capacity, width), dtype=dtype) for key, (width, dtype) in row_shapes.items()}
+        offsets = [0]
+        point_counts = []
+
+        for compressed_data, data in frames:
+            if output == "mesh":
+                result = self.decode_mesh(compressed_data, data, copy=False)
+                rows = result["face_count"]
+            else:
+                result = self.decode(compressed_data, data, output=output, dedup=dedup)
+                rows = len(result[output])
+
+            start = offsets[-1]
+            end = start + rows
+            if end > capacity:
+                capacity = max(end, capacity * 2)
+                for key, array in stacked.items():
+                    grown = np.empty((capacity, array.shape[1]), dtype=array.dtype)
+                    grown[:start] = array[:start]
+                    stacked[key] = grown
+
+            for key, array in stacked.items():
+                array[start:end] = result[key].reshape(rows, array.shape[1])
+
+            offsets.append(end)
+            point_counts.append(result["point_count"])
+
+        total = offsets[-1]
+        result = {
+            "frame_count": len(point_counts),
+            "point_counts": np.array(point_counts, dtype=np.int64),
+        }
+        if output == "mesh":
+            result["face_offsets"] = np.array(offsets, dtype=np.int64)
+            for key, array in stacked.items():
+                result[key] = array[:total].reshape(-1)
+        else:
+            result[f"{output[:-1]}_offsets"] = np.array(offsets, dtype=np.int64)
+            result[output] = stacked[output][:total]
+        return result
+
+    def decode_voxels(self, compressed_data, data):
+        """
+        Decode only the occupancy of a voxel map: an (N, 3) int32 array of the x, y, z grid
+        coordinates of every occupied voxel, in the decoder's order (z, then y, then x).
+        World coordinates are origin + coordinates * resolution.
+        """
+        if self.backend == "numpy":
+            bitmap = self.numpy_decoder.decompress(compressed_data, int(data.get("src_size") or 0))
+        else:
+            # The wasm module always meshes too; the bitmap is left in its decompression buffer
+            self.decode_mesh(compressed_data, data, copy=False)
+            size = max(self.get_value(self.decompressedSize, "i32"), 0)
+            bitmap = self.heap[self.decompressBuffer:self.decompressBuffer + size]
+        return voxel_coordinates(bitmap)
+
+    def decode_mesh(self, compressed_data, data, out=None, copy=True):
+        if self.backend == "numpy":
+            return self.numpy_decoder.decode(compressed_data, data, out=out, copy=copy)
+
+        size = len(compressed_data)
+        self.ensure_capacity("input", size)
+        # The header knows the decompressed size, so size that buffer up front when possible
+        self.ensure_capacity("decompress", int(data.get("src_size") or 0))
+        try:
+            # Keep headroom above the largest frame seen so far
+            self.ensure_capacity("faces", self.high_water["faces"] * 5 // 4)
+        except MemoryError:
+            pass
 
         some_v = math.floor(data["origin"][2] / data["resolution"])
 
-        self.generate(
-            self.store,
-            self.input,
-            len(compressed_data),
-            self.decompressBufferSize,
-            self.decompressBuffer,
-            self.decompressedSize, 
-            self.positions,
-            self.uvs,
-            self.indices,          
-            self.faceCount,
-            self.pointCount,        
-            some_v
-        )
-
-        self.get_value(self.decompressedSize, "i32")
-        c = self.get_value(self.pointCount, "i32")
-        u = self.get_value(self.faceCount, "i32")
-
-        positions_slice = self.HEAPU8[self.positions:self.positions + u * 12]
-        positions_copy = bytearray(positions_slice)
-        p = np.frombuffer(positions_copy, dtype=np.uint8)
-
-        uvs_slice = self.HEAPU8[self.uvs:self.uvs + u * 8]
-        uvs_copy = bytearray(uvs_slice)
-        r = np.frombuffer(uvs_copy, dtype=np.uint8)
-
-        indices_slice = self.HEAPU8[self.indices:self.indices + u * 24]
-        indices_copy = bytearray(indices_slice)
-        o = np.frombuffer(indices_copy, dtype=np.uint32)
+        for attempt in range(MAX_DECODE_ATTEMPTS):
+            self.add_value_arr(self.input, compressed_data)
+            try:
+                self.generate(
+                    self.store,
+                    self.input,
+                    size,
+                    self.decompressBufferSize,
+                    self.decompressBuffer,
+                    self.decompressedSize, 
+                    self.positions,
+                    self.uvs,
+                    self.indices,          
+                    self.faceCount,
+                    self.pointCount,        
+                    some_v
+                )
+            except self.trap_errors:
+                # The mesh ran past the end of the memory: retry in a fresh instance
+                if not self.rebuild(self.capacity["faces"] * 2):
+                    raise MemoryError("Voxel map mesh does not fit in the libvoxel.wasm memory")
+                continue
+
+            decompressed = self.get_value(self.decompressedSize, "i32")
+            c = self.get_value(self.pointCount, "i32")
+            u = self.get_value(self.faceCount, "i32")
+
+            if decompressed < 0:
+                if "src_size" in data or self.capacity["decompress"] >= size * LZ4_MAX_RATIO:
+                    raise ValueError(f"Voxel map could not be decompressed (error {decompressed})")
+                # Did not fit: retry with a buffer sized for typical frames, then with one
+                # large enough for any frame of this compressed size
+                if self.capacity["decompress"] < size * 4:
+                    self.ensure_capacity("decompress", size * 4)
+                else:
+                    self.ensure_capacity("decompress", size * LZ4_MAX_RATIO)
+                continue
+
+            if u > self.capacity["faces"]:
+                # The mesh overflowed its buffers and overwrote the heap behind them, so the
+                # instance can no longer be trusted: start over with buffers that fit
+                if not self.rebuild(u):
+                    raise MemoryError(f"Voxel map mesh with {u} faces does not fit in the libvoxel.wasm memory")
+                continue
+
+            break
+        else:
+            raise MemoryError("Voxel map does not fit in the decoder buffers")
+
+        self.high_water["input"] = max(self.high_water["input"], size)
+        self.high_water["decompressed"] = max(self.high_water["decompressed"], decompressed)
+        self.high_water["faces"] = max(self.high_water["faces"], u)
+
+        p = self.heap[self.positions:self.positions + u * 12]
+        r = self.heap[self.uvs:self.uvs + u * 8]
+        o = self.heap[self.indices:self.indices + u * 24].view(np.uint32)
+
+        if out is not None:
+            p = self._copy_into(out["positions"], p)
+            r = self._copy_into(out["uvs"], r)
+            o = self._copy_into(out["indices"], o)
+        elif copy:
+            p = p.copy()
+            r = r.copy()
+            o = o.copy()
 
         return {
             "point_count": c,
@@ -159,3 +584,11 @@ class LidarDecoder:
             "uvs": r,
             "indices": o
         }
+
+    @staticmethod
+    def _copy_into(target, source):
+        if len(target) < len(source):
+            raise ValueError(f"Output array too small: {len(target)} < {len(source)}")
+        result = target[:len(source)]
+        np.copyto(result, source, casting="no")
+        return result
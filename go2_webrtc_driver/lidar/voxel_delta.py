@@ -0,0 +1,138 @@
+import math
+import numpy as np
+
+from .voxel_map import grid_index
+
+DEFAULT_KEYFRAME_INTERVAL = 30
+
+# Global voxel indices are packed into one int64 key, 21 bits per axis
+KEY_BITS = 21
+KEY_OFFSET = 1 << (KEY_BITS - 1)
+KEY_MASK = (1 << KEY_BITS) - 1
+
+
+def pack_voxels(voxels):
+    """Pack (N, 3) global x, y, z voxel indices into sorted, unique int64 keys."""
+    voxels = np.asarray(voxels, dtype=np.int64).reshape(-1, 3) + KEY_OFFSET
+    keys = (voxels[:, 0] << (2 * KEY_BITS)) | (voxels[:, 1] << KEY_BITS) | voxels[:, 2]
+    return np.unique(keys)
+
+
+def unpack_voxels(keys):
+    """Inverse of pack_voxels: (N, 3) int32 global x, y, z voxel indices."""
+    voxels = np.empty((len(keys), 3), dtype=np.int32)
+    voxels[:, 0] = (keys >> (2 * KEY_BITS)) - KEY_OFFSET
+    voxels[:, 1] = ((keys >> KEY_BITS) & KEY_MASK) - KEY_OFFSET
+    voxels[:, 2] = (keys & KEY_MASK) - KEY_OFFSET
+    return voxels
+
+
+class VoxelDeltaEncoder:
+    """
+    Turns consecutive voxel frames into a stream of changes.
+
+    update() keeps the voxel set of the previous frame and returns only the voxels that
+    were added and removed since then, as (N, 3) int32 global voxel indices (frame voxel
+    coordinates shifted by the origin's voxel, see voxel_map.grid_index, so a moving origin
+    is not a change by itself). Every delta carries a sequence number; every `keyframe_interval` frames, and
+    whenever the resolution changes, a keyframe holding the full voxel set in "added" is
+    sent instead so a receiver can (re)start from it.
+    """
+
+    def __init__(self, keyframe_interval=DEFAULT_KEYFRAME_INTERVAL) -> None:
+        self.keyframe_interval = keyframe_interval
+        self.sequence = -1
+        self.resolution = None
+        self.previous = None
+        self.force_keyframe = True
+
+    def update(self, voxels, origin, resolution):
+        base = grid_index(origin, resolution)
+        current = pack_voxels(np.asarray(voxels, dtype=np.int64).reshape(-1, 3) + base)
+
+        self.sequence += 1
+        keyframe = (
+            self.force_keyframe
+            or self.previous is None
+            or not math.isclose(self.resolution, resolution)
+            or (self.keyframe_interval and self.sequence % self.keyframe_interval == 0)
+        )
+        if keyframe:
+            added = current
+            removed = current[:0]
+        else:
+            added = np.setdiff1d(current, self.previous, assume_unique=True)
+            removed = np.setdiff1d(self.previous, current, assume_unique=True)
+
+        self.previous = current
+        self.resolution = resolution
+        self.force_keyframe = False
+
+        return {
+            "sequence": self.sequence,
+            "keyframe": bool(keyframe),
+            "resolution": resolution,
+            "origin": list(origin),
+            "voxel_count": len(current),
+            "added": unpack_voxels(added),
+            "removed": unpack_voxels(removed)
+        }
+
+    def request_keyframe(self):
+        """Make the next update() a keyframe, e.g. when a new receiver joins."""
+        self.force_keyframe = True
+
+
+class VoxelDeltaStage:
+    """
+    Delta encoding for one subscriber: apply() replaces the voxels of a decoded lidar message
+    by the changes since the frame this subscriber got last, with an encoder per topic. It
+    runs when the message is delivered, so frames the subscriber never gets (conflated,
+    rate limited, filtered or dropped from its queue) are not part of its stream.
+    """
+
+    def __init__(self, keyframe_interval=DEFAULT_KEYFRAME_INTERVAL) -> None:
+        self.keyframe_interval = keyframe_interval
+        self.encoders = {}
+
+    def apply(self, message):
+        data = message.get("data")
+        if not isinstance(data, dict) or not isinstance(data.get("data"), dict) or "voxels" not in data["data"]:
+            return message
+        encoder = self.encoders.get(message.get("topic"))
+        if encoder is None:
+            encoder = self.encoders[message.get("topic")] = VoxelDeltaEncoder(self.keyframe_interval)
+        delta = encoder.update(data["data"]["voxels"], data["origin"], data["resolution"])
+        # The decoded message is shared with other subscribers and the latest-value cache
+        return {**message, "data": {**data, "data": delta}}
+
+
+class VoxelDeltaDecoder:
+    """
+    Rebuilds the voxel set from a delta stream produced by VoxelDeltaEncoder.
+
+    apply() returns the current (N, 3) int32 global voxel indices, or None while the
+    stream cannot be followed: before the first keyframe and after a missing sequence
+    number, until the next keyframe arrives.
+    """
+
+    def __init__(self) -> None:
+        self.sequence = None
+        self.current = None
+        self.gaps = 0
+
+    def apply(self, delta):
+        if delta["keyframe"]:
+            self.current = pack_voxels(delta["added"])
+        elif self.current is None or delta["sequence"] != self.sequence + 1:
+            if self.current is not None:
+                self.gaps += 1
+            self.current = None
+            self.sequence = delta["sequence"]
+            return None
+        else:
+            remaining = np.setdiff1d(self.current, pack_voxels(delta["removed"]), assume_unique=True)
+            self.current = np.union1d(remaining, pack_voxels(delta["added"]))
+
+        self.sequence = delta["sequence"]
+        return unpack_voxels(self.current)
@@ -0,0 +1,189 @@
+import math
+import numpy as np
+
+from .voxel_numpy import GRID_X, GRID_Y, GRID_Z
+
+DEFAULT_CHUNK_SIZE = 16
+DEFAULT_MAX_CHUNKS = 4096
+
+# Coordinates a hair below a voxel boundary because of float rounding still count as on it
+GRID_EPSILON = 1e-6
+
+
+def grid_index(coordinates, resolution):
+    """Global grid index of the voxels containing world-frame coordinates (meters)."""
+    return np.floor(np.asarray(coordinates, dtype=np.float64) / resolution + GRID_EPSILON).astype(np.int64)
+
+
+def group_by_chunk(cells, size):
+    """
+    Sort voxel indices by chunk once: returns the sort order, and per chunk its key and
+    the [start, end) range of its voxels in that order.
+    """
+    keys = cells // size
+    order = np.lexsort((keys[:, 2], keys[:, 1], keys[:, 0]))
+    keys = keys[order]
+    starts = np.flatnonzero(np.any(keys[1:] != keys[:-1], axis=1)) + 1
+    starts = np.concatenate(([0], starts))
+    ends = np.append(starts[1:], len(keys))
+    return order, map(tuple, keys[starts].tolist()), starts.tolist(), ends.tolist()
+
+
+class VoxelOccupancyMap:
+    """
+    Global voxel occupancy map, merged incrementally from streamed lidar frames.
+
+    Each frame covers a 128 x 128 x 30 voxel window placed at the frame's `origin`; inside
+    that window the frame replaces what the map knew, outside of it the map is kept. The
+    map is stored sparsely as cubic boolean chunks of `chunk_size` voxels per side in a
+    dict, so an occupancy query is a dict lookup plus an array index.
+
+    Memory is bounded by `max_chunks`: when a frame leaves more chunks than that, the ones
+    farthest from the center of that frame's window are evicted.
+
+    Voxels and query points map to grid indices the same way (see grid_index): a frame
+    voxel goes to the map voxel containing its lower corner, a point to the one containing
+    it. Frame origins off the map grid are snapped down to it.
+
+    Feed it frames decoded with output="voxels" (see LidarDecoder.decode), either with
+    integrate() or directly as a subscription callback with integrate_message().
+    """
+
+    def __init__(self, chunk_size=DEFAULT_CHUNK_SIZE, max_chunks=DEFAULT_MAX_CHUNKS) -> None:
+        self.chunk_size = chunk_size
+        self.max_chunks = max_chunks
+        self.resolution = None
+        self.chunks = {}
+        self.center = None  # Chunk coordinates of the last frame's window center
+        self.frames = 0
+        self.evicted = 0
+
+    def integrate(self, voxels, origin, resolution, window=(GRID_X, GRID_Y, GRID_Z)):
+        """
+        Merge one frame: `voxels` are the (N, 3) x, y, z grid coordinates of its occupied
+        voxels, `origin` and `resolution` come from the frame header.
+        """
+        if self.resolution is None:
+            self.resolution = float(resolution)
+        elif not math.isclose(self.resolution, resolution):
+            raise ValueError(f"Frame resolution {resolution} does not match the map resolution {self.resolution}")
+
+        voxels = np.asarray(voxels, dtype=np.int64).reshape(-1, 3)
+        base = grid_index(origin, self.resolution)
+        extent = np.array(window, dtype=np.int64)
+        if len(voxels):
+            extent = np.maximum(extent, voxels.max(axis=0) + 1)
+
+        self.clear_box(base, base + extent)
+
+        size = self.chunk_size
+        if len(voxels):
+            cells = voxels + base
+            order, keys, starts, ends = group_by_chunk(cells, size)
+            local = (cells % size)[order]
+            for key, start, end in zip(keys, starts, ends):
+                chunk = self.chunks.get(key)
+                if chunk is None:
+                    chunk = self.chunks[key] = np.zeros((size, size, size), dtype=bool)
+                selected = local[start:end]
+                chunk[selected[:, 0], selected[:, 1], selected[:, 2]] = True
+
+        self.center = (base + extent / 2) / size
+        self.frames += 1
+        self.evict()
+
+    def integrate_message(self, message):
+        """Subscription callback for lidar messages decoded with output="voxels"."""
+        data = message["data"]
+        self.integrate(data["data"]["voxels"], data["origin"], data["resolution"])
+
+    def clear_box(self, low, high):
+        """Mark every voxel in [low, high) free, dropping chunks that end up empty."""
+        size = self.chunk_size
+        first = low // size
+        last = (high - 1) // size
+        for cx in range(first[0], last[0] + 1):
+            for cy in range(first[1], last[1] + 1):
+                for cz in range(first[2], last[2] + 1):
+                    key = (cx, cy, cz)
+                    chunk = self.chunks.get(key)
+                    if chunk is None:
+                        continue
+                    start = np.maximum(low - np.array(key) * size, 0)
+                    end = np.minimum(high - np.array(key) * size, size)
+                    if not start.any() and (end == size).all():
+                        del self.chunks[key]
+                        continue
+                    chunk[start[0]:end[0], start[1]:end[1], start[2]:end[2]] = False
+                    if not chunk.any():
+                        del self.chunks[key]
+
+    def evict(self):
+        """Drop the chunks farthest from the last frame until at most max_chunks are left."""
+        excess = len(self.chunks) - self.max_chunks
+        if excess <= 0:
+            return
+        keys = list(self.chunks)
+        distances = np.linalg.norm(np.array(keys, dtype=np.float64) + 0.5 - self.center, axis=1)
+        for index in np.argpartition(distances, -excess)[-excess:]:
+            del self.chunks[keys[index]]
+        self.evicted += excess
+
+    def is_occupied_index(self, x, y, z):
+        """Occupancy of the voxel with global grid index (x, y, z)."""
+        size = self.chunk_size
+        chunk = self.chunks.get((x // size, y // size, z // size))
+        return chunk is not None and bool(chunk[x % size, y % size, z % size])
+
+    def is_occupied(self, x, y, z):
+        """Occupancy of the voxel containing the world-frame point (x, y, z), in meters."""
+        if self.resolution is None:
+            return False
+        return self.is_occupied_index(*grid_index((x, y, z), self.resolution).tolist())
+
+    def query(self, points):
+        """Occupancy of the voxels containing each of the (N, 3) world-frame points."""
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+        occupied = np.zeros(len(points), dtype=bool)
+        if self.resolution is None or not len(points):
+            return occupied
+
+        size = self.chunk_size
+        cells = grid_index(points, self.resolution)
+        order, keys, starts, ends = group_by_chunk(cells, size)
+        local = (cells % size)[order]
+        for key, start, end in zip(keys, starts, ends):
+            chunk = self.chunks.get(key)
+            if chunk is None:
+                continue
+            selected = local[start:end]
+            occupied[order[start:end]] = chunk[selected[:, 0], selected[:, 1], selected[:, 2]]
+        return occupied
+
+    def occupied_voxels(self):
+        """(N, 3) int64 global grid indices of all occupied voxels."""
+        parts = [np.argwhere(chunk) + np.array(key) * self.chunk_size for key, chunk in self.chunks.items()]
+        if not parts:
+            return np.zeros((0, 3), dtype=np.int64)
+        return np.concatenate(parts)
+
+    def occupied_points(self):
+        """(N, 3) float32 world-frame corners of all occupied voxels."""
+        if self.resolution is None:
+            return np.zeros((0, 3), dtype=np.float32)
+        return (self.occupied_voxels() * self.resolution).astype(np.float32)
+
+    def clear(self):
+        self.chunks.clear()
+        self.resolution = None
+        self.center = None
+        self.frames = 0
+        self.evicted = 0
+
+    def stats(self):
+        return {
+            "frames": self.frames,
+            "chunks": len(self.chunks),
+            "evicted": self.evicted,
+            "bytes": len(self.chunks) * self.chunk_size ** 3,
+        }
@@ -0,0 +1,228 @@
+import math
+import numpy as np
+
+try:
+    import lz4.block as lz4_block
+except ImportError:
+    lz4_block = None
+
+# Voxel map layout used by libvoxel.wasm: 128 x 128 voxels per layer, one bit per voxel
+# (most significant bit first, x fastest, then y, then z). Neighbours are only looked up
+# in the first 30 layers, like the wasm implementation does.
+GRID_X = 128
+GRID_Y = 128
+GRID_Z = 30
+LAYER_VOXELS = GRID_X * GRID_Y
+
+DEFAULT_DECOMPRESS_BUFFER_SIZE = 80000
+MAX_DECOMPRESS_ATTEMPTS = 4
+
+# Neighbour offsets (x, y, z) of the six faces, in the order the wasm module emits them
+FACE_DIRECTIONS = np.array([
+    [-1, 0, 0],
+    [1, 0, 0],
+    [0, -1, 0],
+    [0, 1, 0],
+    [0, 0, -1],
+    [0, 0, 1],
+], dtype=np.int64)
+
+# Four (x, y, z) corner offsets for every face, same order as FACE_DIRECTIONS
+FACE_VERTICES = np.array([
+    [0, 1, 0, 0, 0, 0, 0, 1, 1, 0, 0, 1],
+    [1, 1, 1, 1, 0, 1, 1, 1, 0, 1, 0, 0],
+    [1, 0, 1, 0, 0, 1, 1, 0, 0, 0, 0, 0],
+    [0, 1, 1, 1, 1, 1, 0, 1, 0, 1, 1, 0],
+    [1, 0, 0, 0, 0, 0, 1, 1, 0, 0, 1, 0],
+    [0, 0, 1, 1, 0, 1, 0, 1, 1, 1, 1, 1],
+], dtype=np.uint8)
+
+# Voxel axis (x=0, y=1, z=2) each of the 12 vertex components is offset by
+VERTEX_AXES = np.array([0, 1, 2] * 4)
+
+FACE_INDICES = np.array([0, 1, 2, 2, 1, 3], dtype=np.uint32)
+
+
+def lz4_decompress_block(source, capacity):
+    """
+    Decompress a raw LZ4 block (no frame, no size header) of at most `capacity` bytes.
+    Returns None for malformed input or output that would not fit, like LZ4_decompress_safe.
+    """
+    if lz4_block is not None:
+        try:
+            return lz4_block.decompress(source, uncompressed_size=capacity)
+        except lz4_block.LZ4BlockError:
+            return None
+
+    source = memoryview(source).cast("B")
+    source_length = len(source)
+    output = bytearray()
+    position = 0
+
+    while position < source_length:
+        token = source[position]
+        position += 1
+
+        # Literals
+        literal_length = token >> 4
+        if literal_length == 15:
+            while True:
+                if position >= source_length:
+                    return None
+                extra = source[position]
+                position += 1
+                literal_length += extra
+                if extra != 255:
+                    break
+        if position + literal_length > source_length or len(output) + literal_length > capacity:
+            return None
+        output += source[position:position + literal_length]
+        position += literal_length
+
+        # The last sequence has no match part
+        if position == source_length:
+            break
+
+        # Match
+        if position + 2 > source_length:
+            return None
+        offset = source[position] | (source[position + 1] << 8)
+        position += 2
+        match_length = token & 15
+        if match_length == 15:
+            while True:
+                if position >= source_length:
+                    return None
+                extra = source[position]
+                position += 1
+                match_length += extra
+                if extra != 255:
+                    break
+        match_length += 4
+
+        start = len(output) - offset
+        if offset == 0 or start < 0 or len(output) + match_length > capacity:
+            return None
+        if offset >= match_length:
+            output += output[start:start + match_length]
+        else:
+            # Overlapping match: repeat the last `offset` bytes
+            pattern = output[start:]
+            repeats, remainder = divmod(match_length, offset)
+            output += pattern * repeats + pattern[:remainder]
+
+    return bytes(output)
+
+
+def voxel_coordinates(bitmap):
+    """(N, 3) int32 x, y, z grid coordinates of the set voxels of a decompressed bitmap."""
+    voxels = np.flatnonzero(np.unpackbits(bitmap))
+    coordinates = np.empty((len(voxels), 3), dtype=np.int32)
+    coordinates[:, 0] = voxels & (GRID_X - 1)
+    coordinates[:, 1] = (voxels >> 7) & (GRID_Y - 1)
+    coordinates[:, 2] = voxels >> 14
+    return coordinates
+
+
+class NumpyVoxelDecoder:
+    """
+    Pure NumPy implementation of the libvoxel.wasm voxel map decoder.
+
+    Produces the same point_count / face_count / positions / uvs / indices output as the
+    wasm backend. LZ4 decompression uses the `lz4` package when it is installed and a
+    pure Python fallback otherwise; mesh generation is fully vectorized.
+
+    Bitmap bytes past the decompressed size always read as empty. The wasm backend reuses
+    its decompression buffer, so for a frame shorter than the previous one it looks up
+    neighbours in whatever that frame left behind.
+    """
+
+    def __init__(self, decompress_buffer_size=DEFAULT_DECOMPRESS_BUFFER_SIZE) -> None:
+        self.decompressBufferSize = decompress_buffer_size
+
+    def decompress(self, compressed_data, size_hint=0):
+        """Return the decompressed voxel bitmap as a uint8 array (empty if the data is invalid)."""
+        compressed_data = bytes(compressed_data)
+        capacity = max(self.decompressBufferSize, size_hint)
+        decompressed = lz4_decompress_block(compressed_data, capacity)
+
+        # Without a size in the header, retry with more room like the wasm backend does
+        attempts = 1 if size_hint else MAX_DECOMPRESS_ATTEMPTS
+        while decompressed is None and attempts > 1:
+            attempts -= 1
+            capacity *= 2
+            decompressed = lz4_decompress_block(compressed_data, capacity)
+
+        if not decompressed:
+            return np.zeros(0, dtype=np.uint8)
+        return np.frombuffer(decompressed, dtype=np.uint8)
+
+    @staticmethod
+    def occupied_voxels(bitmap):
+        """Flat indices (z * 128 * 128 + y * 128 + x) of the set voxels, in ascending order."""
+        return np.flatnonzero(np.unpackbits(bitmap))
+
+    def decode(self, compressed_data, data, out=None, copy=True):
+        bitmap = self.decompress(compressed_data, int(data.get("src_size") or 0))
+        some_v = math.floor(data["origin"][2] / data["resolution"])
+        result = self.generate_mesh(bitmap, some_v)
+
+        if out is not None:
+            for key in ("positions", "uvs", "indices"):
+                target = out[key]
+                if len(target) < len(result[key]):
+                    raise ValueError(f"Output array too small: {len(target)} < {len(result[key])}")
+                np.copyto(target[:len(result[key])], result[key], casting="no")
+                result[key] = target[:len(result[key])]
+
+        # Arrays are always freshly allocated here, so there is nothing to copy for copy=True
+        return result
+
+    @staticmethod
+    def generate_mesh(bitmap, some_v):
+        bits = np.unpackbits(bitmap)
+        voxels = np.flatnonzero(bits)
+        x = voxels & (GRID_X - 1)
+        y = (voxels >> 7) & (GRID_Y - 1)
+        z = voxels >> 14
+
+        # Neighbour lookups go through a grid padded by one empty voxel on every side, so
+        # everything outside the 128x128x30 window reads as empty without bounds checks
+        layers = max(int(z[-1]) + 1 if len(z) else 0, GRID_Z)
+        padded = np.zeros((layers + 2, GRID_Y + 2, GRID_X + 2), dtype=bool)
+        visible = np.zeros(GRID_Z * LAYER_VOXELS, dtype=bool)
+        visible[:min(len(bits), len(visible))] = bits[:len(visible)]
+        padded[1:GRID_Z + 1, 1:-1, 1:-1] = visible.reshape(GRID_Z, GRID_Y, GRID_X)
+        padded = padded.reshape(-1)
+
+        stride_y = GRID_X + 2
+        stride_z = (GRID_Y + 2) * stride_y
+        padded_index = (z + 1) * stride_z + (y + 1) * stride_y + (x + 1)
+        offsets = FACE_DIRECTIONS @ np.array([1, stride_y, stride_z])
+
+        # A face is emitted towards every empty neighbour, voxel by voxel, direction by direction
+        neighbour = padded[padded_index[:, None] + offsets]
+        face_voxel, face_direction = np.nonzero(~neighbour)
+        face_count = len(face_voxel)
+
+        # uint8 arithmetic wraps exactly like the byte stores in the wasm code
+        corners = np.stack([x, y, z], axis=1).astype(np.uint8)[:, VERTEX_AXES]
+        positions = FACE_VERTICES[face_direction] + corners[face_voxel]
+
+        # Texture coordinates encode the height band; layer 0 keeps the initial band
+        band = np.clip(z + some_v, -10, 20) * 6
+        voxel_uvs = np.zeros((len(voxels), 8), dtype=np.uint8)
+        voxel_uvs[:, 0] = voxel_uvs[:, 2] = np.where(z == 0, 6, band + 66)
+        voxel_uvs[:, 4] = voxel_uvs[:, 6] = np.where(z == 0, 0, band + 60)
+        voxel_uvs[:, 3] = voxel_uvs[:, 7] = 255
+        uvs = voxel_uvs[face_voxel]
+
+        indices = np.arange(0, face_count * 4, 4, dtype=np.uint32)[:, None] + FACE_INDICES
+
+        return {
+            "point_count": len(voxels),
+            "face_count": face_count,
+            "positions": positions.reshape(-1),
+            "uvs": uvs.reshape(-1),
+            "indices": indices.reshape(-1)
+        }
@@ -0,0 +1,101 @@
+class ChunkAssembly:
+    """
+    Reassembly buffer of one chunked payload, with chunks numbered 1 to `total_chunks`.
+
+    Every chunk except the last has the same size, so a chunk's offset follows from its
+    index once that size is known. The buffer is allocated once: `total_size` bytes when the
+    sender announces it, otherwise `total_chunks` chunks and trimmed in place when the last
+    chunk is in. Chunks are copied into place through a memoryview as they arrive, in any
+    order; a chunk whose offset is not known yet (the last one, before any other arrived)
+    is held until it is. Duplicates are ignored.
+    """
+
+    def __init__(self, total_chunks, total_size=None):
+        if not total_chunks:
+            raise ValueError("Total number of chunks cannot be zero")
+        self.total_chunks = total_chunks
+        self.total_size = int(total_size) if total_size is not None else None
+        self.received = bytearray(total_chunks + 1)  # 1 at the index of every chunk received
+        self.count = 0
+        self.nbytes = 0
+        self.chunk_size = None
+        self.last_size = None
+        self.buffer = None
+        self.view = None
+        self.held = None  # The last chunk, until its offset is known
+
+    @property
+    def complete(self):
+        return self.count == self.total_chunks
+
+    @property
+    def allocated(self):
+        return len(self.buffer) if self.buffer is not None else 0
+
+    def add(self, index, chunk):
+        """Store a chunk; False if it is a duplicate."""
+        if index is None:
+            raise ValueError("Chunk index is missing")
+        if not 1 <= index <= self.total_chunks:
+            raise ValueError(f"Chunk index {index} out of range 1..{self.total_chunks}")
+        if self.received[index]:
+            return False
+        if not isinstance(chunk, (bytes, bytearray, memoryview)):
+            chunk = bytes(chunk)
+
+        if index == self.total_chunks:
+            self.last_size = len(chunk)
+            if self.total_chunks == 1:
+                self.buffer = chunk
+            elif self.chunk_size is None and self.total_size is None:
+                self.held = chunk
+            else:
+                self.write(self.total_chunks, chunk)
+        else:
+            if self.chunk_size is None:
+                self.chunk_size = len(chunk)
+            elif len(chunk) != self.chunk_size:
+                raise ValueError(f"Chunk {index} has {len(chunk)} bytes, expected {self.chunk_size}")
+            self.write(index, chunk)
+            if self.held is not None:
+                held, self.held = self.held, None
+                self.write(self.total_chunks, held)
+
+        self.received[index] = 1
+        self.count += 1
+        self.nbytes += len(chunk)
+        return True
+
+    def write(self, index, chunk):
+        if self.buffer is None:
+            size = self.total_size if self.total_size is not None else self.total_chunks * self.chunk_size
+            self.buffer = bytearray(size)
+            self.view = memoryview(self.buffer)
+
+        if index == self.total_chunks and self.chunk_size is None:
+            offset = self.total_size - len(chunk)
+        else:
+            offset = (index - 1) * self.chunk_size
+        end = offset + len(chunk)
+        if offset < 0 or end > len(self.buffer):
+            raise ValueError(f"Chunk {index} does not fit the {len(self.buffer)} byte payload")
+        self.view[offset:end] = chunk
+
+    def finish(self):
+        """
+        The assembled payload, not a copy: the buffer trimmed to its size, a bytearray, or
+        for a single-chunk payload the chunk itself as it was added (usually bytes).
+        """
+        if not self.complete:
+            raise ValueError(f"Only {self.count} of {self.total_chunks} chunks received")
+        if self.view is not None:
+            self.view.release()
+            self.view = None
+        if self.total_chunks > 1:
+            size = (self.total_chunks - 1) * self.chunk_size + self.last_size
+            if size != len(self.buffer):
+                if self.total_size is not None:
+                    raise ValueError(f"Chunks add up to {size} bytes, expected {self.total_size}")
+                del self.buffer[size:]
+        payload, self.buffer = self.buffer, None
+        return payload
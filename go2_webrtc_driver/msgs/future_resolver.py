@@ -1,20 +1,177 @@
+import asyncio
+import collections
+import functools
 import logging
+import random
 from ..constants import DATA_CHANNEL_TYPE
 from ..util import get_nested_field
+from .timer_wheel import TimerWheel
+from .chunk_assembly import ChunkAssembly
+
+DEFAULT_REQUEST_TIMEOUT = 30.0  # Seconds to wait for an API response, see WebRTCDataChannelPubSub.publish_request_new()
+DEFAULT_CHUNK_TIMEOUT = 10.0  # Seconds a partial chunked response is kept without a new chunk
+MAX_REQUEST_ID = 2147483647  # Request ids are positive int32 values
 
 class FutureResolver:
-    def __init__(self):
+    """
+    Futures of sent requests, resolved by their responses, and the chunks of chunked
+    responses until the last one arrives.
+
+    Requests can have a deadline: a single TimerWheel fails their futures with
+    asyncio.TimeoutError once it passes. While chunks of a response keep arriving the
+    deadline is pushed back to at least `chunk_timeout` after the latest chunk, and a
+    partial chunk set without a new chunk for `chunk_timeout` seconds is dropped along with
+    the futures waiting for it. Futures cancelled by their caller are forgotten right away.
+    """
+
+    def __init__(self, chunk_timeout=DEFAULT_CHUNK_TIMEOUT):
         self.pending_responses = {}
         self.pending_callbacks = {}
-        self.chunk_data_storage = {}
-
-    def save_resolve(self, message_type, topic, future, identifier):
+        self.pending_topics = collections.Counter()  # (type, topic) of every pending future
+        self.chunk_data_storage = {}  # ChunkAssembly of every partially received response
+        self.chunk_timeout = chunk_timeout
+        self.timers = TimerWheel()
+        self.timed_out = 0
+        self.cancelled = 0
+        self.expired_chunk_sets = 0
+        self.duplicate_chunks = 0
+        self.last_request_id = random.randint(1, MAX_REQUEST_ID)
+
+    def next_request_id(self):
+        """
+        Correlation id for a request: a counter starting at a random value, skipping ids of
+        requests still pending, so concurrent requests never share an id.
+        """
+        while True:
+            self.last_request_id = self.last_request_id % MAX_REQUEST_ID + 1
+            if self.last_request_id not in self.pending_callbacks:
+                return self.last_request_id
+
+    def save_resolve(self, message_type, topic, future, identifier, timeout=None):
         key = self.generate_message_key(message_type,topic,identifier)
         if key in self.pending_callbacks:
             self.pending_callbacks[key].append(future)
         else:
             self.pending_callbacks[key] = [future]
 
+        if timeout is not None:
+            deadline = asyncio.get_event_loop().time() + timeout
+            self.timers.schedule(future, deadline, functools.partial(self.expire_future, key, future))
+        self.pending_topics[(message_type, topic)] += 1
+        future.add_done_callback(functools.partial(self.future_done, key, (message_type, topic)))
+
+    def future_done(self, key, topic_key, future):
+        self.forget_future(key, future)
+        self.pending_topics[topic_key] -= 1
+        if not self.pending_topics[topic_key]:
+            del self.pending_topics[topic_key]
+
+    def expire_future(self, key, future):
+        if not future.done():
+            self.timed_out += 1
+            future.set_exception(asyncio.TimeoutError(f"No response to {key}"))
+        self.forget_future(key, future)
+
+    def forget_future(self, key, future):
+        """Drop a future that is done (resolved, timed out or cancelled) and its deadline."""
+        self.timers.cancel(future)
+        futures = self.pending_callbacks.get(key)
+        if futures is not None and future in futures:
+            if future.cancelled():
+                self.cancelled += 1
+            futures.remove(future)
+            if not futures:
+                del self.pending_callbacks[key]
+
+    def store_chunk(self, key, chunk_index, total_chunks, data_chunk, total_size=None):
+        """
+        Put one chunk of a response in place and push back the deadlines waiting for it.
+        Returns the assembled payload once every chunk is in, otherwise None. A chunk that
+        does not fit fails the futures waiting for the response and raises ValueError.
+        """
+        try:
+            return self.add_chunk(key, chunk_index, total_chunks, data_chunk, total_size)
+        except ValueError as error:
+            self.fail_chunks(key, error)
+            raise
+
+    def add_chunk(self, key, chunk_index, total_chunks, data_chunk, total_size=None):
+        assembly = self.chunk_data_storage.get(key)
+        if assembly is None or assembly.total_chunks != total_chunks:
+            assembly = self.chunk_data_storage[key] = ChunkAssembly(total_chunks, total_size)
+
+        deadline = asyncio.get_event_loop().time() + self.chunk_timeout
+        self.timers.schedule(("chunks", key), deadline, functools.partial(self.expire_chunks, key))
+        for future in self.pending_callbacks.get(key, ()):
+            current = self.timers.deadline(future)
+            if current is not None and current < deadline:
+                self.timers.schedule(future, deadline, functools.partial(self.expire_future, key, future))
+
+        if not assembly.add(chunk_index, data_chunk):
+            self.duplicate_chunks += 1
+            return None
+        if not assembly.complete:
+            return None
+        self.take_chunks(key)
+        return assembly.finish()
+
+    def take_chunks(self, key):
+        self.timers.cancel(("chunks", key))
+        return self.chunk_data_storage.pop(key, None)
+
+    def fail_chunks(self, key, error):
+        """Drop a response's chunks and fail the futures waiting for it with `error`."""
+        self.take_chunks(key)
+        for future in self.pending_callbacks.pop(key, ()):
+            self.timers.cancel(future)
+            if not future.done():
+                future.set_exception(error)
+
+    def expire_chunks(self, key):
+        logging.warning("Dropping incomplete chunked response %s", key)
+        self.expired_chunk_sets += 1
+        self.take_chunks(key)
+        for future in list(self.pending_callbacks.get(key, ())):
+            self.expire_future(key, future)
+
+    def cancel_all(self, error=None):
+        """
+        Fail (or cancel, without an `error`) every pending future and drop all partial
+        chunks. Futures nobody awaits any more do not log "exception was never retrieved".
+        """
+        pending, self.pending_callbacks = self.pending_callbacks, {}
+        self.chunk_data_storage.clear()
+        self.timers.clear()
+        for futures in pending.values():
+            for future in futures:
+                if future.done():
+                    continue
+                if error is None:
+                    future.cancel()
+                else:
+                    future.set_exception(error)
+                    future.exception()  # Marks the exception as retrieved
+
+    def stats(self):
+        """Gauges of what is waiting for responses, and counts of what was given up on."""
+        return {
+            "pending_requests": sum(len(futures) for futures in self.pending_callbacks.values()),
+            "pending_chunk_sets": len(self.chunk_data_storage),
+            "pending_chunk_bytes": sum(assembly.nbytes for assembly in self.chunk_data_storage.values()),
+            "pending_chunk_buffer_bytes": sum(assembly.allocated for assembly in self.chunk_data_storage.values()),
+            "deadlines": len(self.timers),
+            "timed_out": self.timed_out,
+            "cancelled": self.cancelled,
+            "expired_chunk_sets": self.expired_chunk_sets,
+            "duplicate_chunks": self.duplicate_chunks,
+        }
+
+    def has_pending(self, message_type, topic):
+        """Whether a message of this type and topic may resolve a pending future or chunk."""
+        # Futures keyed by a request id can only be matched after decoding the message, so
+        # their requests' type and topic are counted separately
+        return bool(self.chunk_data_storage) or (message_type, topic) in self.pending_topics
+
     def run_resolve_for_topic(self, message):
         if not message.get("type"):
             return
@@ -37,40 +194,18 @@ class FutureResolver:
             chunk_index = content_info.get("chunk_index")
             total_chunks = content_info.get("total_chunk_num")
 
-            if total_chunks is None or total_chunks == 0:
-                raise ValueError("Total number of chunks cannot be zero")
-            if chunk_index is None:
-                raise ValueError("Chunk index is missing")
-
             data_chunk = message["data"].get("data")
-            if chunk_index < total_chunks:
-                if key in self.chunk_data_storage:
-                    self.chunk_data_storage[key].append(data_chunk)
-                else:
-                    self.chunk_data_storage[key] = [data_chunk]
+            payload = self.store_chunk(key, chunk_index, total_chunks, data_chunk)
+            if payload is None:
                 return
-            else:
-                self.chunk_data_storage[key].append(data_chunk)
-                message["data"]["data"] = self.merge_array_buffers(self.chunk_data_storage[key])
-                del self.chunk_data_storage[key]
+            message["data"]["data"] = payload
 
         # Resolve the pending future with the final message
         if key in self.pending_callbacks:
-            for future in self.pending_callbacks[key]:
-                if future:
+            for future in self.pending_callbacks.pop(key):
+                self.timers.cancel(future)
+                if future and not future.done():
                     future.set_result(message)  # Resolve the future with the message
-            del self.pending_callbacks[key]
-
-    def merge_array_buffers(self, buffers):
-        total_length = sum(len(buf) for buf in buffers)
-        merged_buffer = bytearray(total_length)
-
-        current_position = 0
-        for buffer in buffers:
-            merged_buffer[current_position:current_position + len(buffer)] = buffer
-            current_position += len(buffer)
-
-        return bytes(merged_buffer)
 
     def run_resolve_for_topic_for_file(self, message):
         key = self.generate_message_key(
@@ -87,32 +222,23 @@ class FutureResolver:
             chunk_index = file_info.get("chunk_index")
             total_chunks = file_info.get("total_chunk_num")
 
-            if total_chunks is None or total_chunks == 0:
-                raise ValueError("Total number of chunks cannot be zero")
-            if chunk_index is None:
-                raise ValueError("Chunk index is missing")
-
-            # Extract the chunk data
+            # Extract the chunk data, ensuring it's in bytes (base64 text)
             data_chunk = file_info.get("data")
+            if isinstance(data_chunk, str):
+                data_chunk = data_chunk.encode('utf-8')
 
-            # Initialize the key in chunk_data_storage if it doesn't exist
-            if key not in self.chunk_data_storage:
-                self.chunk_data_storage[key] = []
-
-            # Append the chunk to the storage, ensuring it's in bytes
-            self.chunk_data_storage[key].append(data_chunk.encode('utf-8') if isinstance(data_chunk, str) else data_chunk)
-
-            # If this is the last chunk, combine all chunks and store the complete data
-            if chunk_index == total_chunks:
-                message["info"]["file"]["data"] = b''.join(self.chunk_data_storage[key])
-                del self.chunk_data_storage[key]  # Clean up the storage
+            # Put the chunk in place; the buffer is sized from the announced base64 size
+            payload = self.store_chunk(key, chunk_index, total_chunks, data_chunk, file_info.get("file_size_after_b64"))
+            if payload is None:
+                return
+            message["info"]["file"]["data"] = payload
 
         # Resolve the pending future with the final message
         if key in self.pending_callbacks:
-            for future in self.pending_callbacks[key]:
-                if future:
+            for future in self.pending_callbacks.pop(key):
+                self.timers.cancel(future)
+                if future and not future.done():
                     future.set_result(message)  # Resolve the future with the message
-            del self.pending_callbacks[key]
 
     def generate_message_key(self, message_type, topic, identifier):
         return identifier or f"{message_type} $ {topic}"
@@ -0,0 +1,80 @@
+import collections
+import threading
+import time
+
+from .. import json_codec
+
+# Newest message of a topic, when it was received on the data channel (time.monotonic(), like
+# TelemetryStore) and its per-topic sequence number
+LatestValue = collections.namedtuple("LatestValue", ["message", "timestamp", "sequence"])
+
+
+class LatestValueCache:
+    """
+    Newest decoded message of every topic.
+
+    Updating and reading are O(1) dict operations on immutable LatestValue entries, and
+    messages are stored by reference, never copied. A lock keeps snapshot() consistent when
+    it is read from another thread (e.g. a web server's worker threads): every entry of a
+    snapshot comes from the same point in the message stream.
+
+    Topics are only cached while their messages are decoded. track() makes sure a topic's
+    messages are decoded even without a subscriber.
+
+    Messages decoded straight into typed states (see raw_decoder in pub_sub) are cached as
+    their JSON text and decoded into the usual dict when they are first read, so readers
+    always get dicts and the typed path does not pay for them.
+    """
+
+    def __init__(self):
+        self.entries = {}
+        self.undecoded = {}  # JSON text of the entries whose message is not decoded yet
+        self.tracked = set()
+        self.lock = threading.Lock()
+
+    def update(self, topic, message, timestamp=None, raw=None):
+        """
+        Cache `message` received at `timestamp` (time.monotonic(), now if not given), or its
+        JSON text `raw` when the message is not a dict.
+        """
+        if timestamp is None:
+            timestamp = time.monotonic()
+        with self.lock:
+            previous = self.entries.get(topic)
+            sequence = previous.sequence + 1 if previous is not None else 0
+            if raw is None:
+                self.undecoded.pop(topic, None)
+            else:
+                message = None
+                self.undecoded[topic] = raw
+            self.entries[topic] = LatestValue(message, timestamp, sequence)
+
+    def get(self, topic):
+        if topic in self.undecoded:
+            with self.lock:
+                self._decode(topic)
+        return self.entries.get(topic)
+
+    def snapshot(self, topics=None):
+        """{topic: LatestValue or None} for `topics`, or for every cached topic."""
+        with self.lock:
+            for topic in list(self.undecoded) if topics is None else topics:
+                self._decode(topic)
+            if topics is None:
+                return dict(self.entries)
+            return {topic: self.entries.get(topic) for topic in topics}
+
+    def _decode(self, topic):
+        """Decode an entry cached as JSON text; the lock must be held."""
+        raw = self.undecoded.pop(topic, None)
+        if raw is not None:
+            self.entries[topic] = self.entries[topic]._replace(message=json_codec.loads(raw))
+
+    def clear(self, topic=None):
+        with self.lock:
+            if topic is None:
+                self.entries.clear()
+                self.undecoded.clear()
+            else:
+                self.entries.pop(topic, None)
+                self.undecoded.pop(topic, None)
@@ -0,0 +1,68 @@
+import asyncio
+import inspect
+import logging
+
+
+class LatestOnlyDelivery:
+    """
+    Conflating delivery for one topic: only the newest message is kept while the subscriber
+    is busy, and it is decoded only when the subscriber is ready for it. Older messages are
+    replaced without ever being decoded and counted in `dropped`.
+
+    With `timestamped` the callback also gets the time.monotonic() the message was received.
+    `voxel_delta` works as in Subscription.
+    """
+
+    def __init__(self, topic, callback, timestamped=False):
+        self.topic = topic
+        self.callback = callback
+        self.timestamped = timestamped
+        self.voxel_delta = None
+        self.pending = None
+        self.task = None
+        self.received = 0
+        self.delivered = 0
+        self.dropped = 0
+
+    def offer(self, raw, decode=None, received=None):
+        """Keep `raw` as the newest message; `decode` (sync or async) turns it into the message."""
+        self.received += 1
+        if self.pending is not None:
+            self.dropped += 1
+        self.pending = (raw, decode, received)
+
+        if self.task is None or self.task.done():
+            self.task = asyncio.ensure_future(self._deliver())
+
+    async def _deliver(self):
+        while self.pending is not None:
+            # Let messages that are already queued replace the pending one first
+            await asyncio.sleep(0)
+
+            (raw, decode, received), self.pending = self.pending, None
+            try:
+                message = raw if decode is None else decode(raw)
+                if inspect.isawaitable(message):
+                    message = await message
+                if self.voxel_delta is not None:
+                    message = self.voxel_delta.apply(message)
+
+                result = self.callback(message, received) if self.timestamped else self.callback(message)
+                if inspect.isawaitable(result):
+                    await result
+                self.delivered += 1
+            except Exception:
+                logging.error("Error delivering latest message on %s", self.topic, exc_info=True)
+
+    def cancel(self):
+        self.pending = None
+        if self.task is not None:
+            self.task.cancel()
+            self.task = None
+
+    def stats(self):
+        return {
+            "received": self.received,
+            "delivered": self.delivered,
+            "dropped": self.dropped,
+        }
@@ -0,0 +1,109 @@
+import ast
+import operator
+import re
+
+OPERATORS = {
+    "<": operator.lt,
+    "<=": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge,
+    "==": operator.eq,
+    "!=": operator.ne,
+}
+
+# "<field path> <operator> <Python literal>", e.g. "bms_state.soc < 20"
+CONDITION_PATTERN = re.compile(r"\s*([\w.]+)\s*(<=|>=|==|!=|<|>)\s*(.+?)\s*$")
+
+# Accessor lookups fail with one of these when a message lacks a field
+MISSING_FIELD_ERRORS = (KeyError, IndexError, TypeError)
+
+
+def compile_path(path):
+    """
+    Accessor for a dotted field path in message["data"], e.g. "bms_state.soc" or
+    "position.2" (numeric segments index lists).
+    """
+    keys = [int(key) if key.isdigit() else key for key in path.split(".")]
+    if len(keys) == 1:
+        return operator.itemgetter(keys[0])
+
+    def get(data):
+        for key in keys:
+            data = data[key]
+        return data
+    return get
+
+
+def compile_condition(condition):
+    """Predicate on message["data"] from a callable or a "<path> <op> <literal>" string."""
+    if callable(condition):
+        return condition
+
+    match = CONDITION_PATTERN.fullmatch(condition)
+    if match is None:
+        raise ValueError(f"Invalid condition: {condition!r}, expected e.g. 'bms_state.soc < 20'")
+    path, symbol, literal = match.groups()
+    get = compile_path(path)
+    compare = OPERATORS[symbol]
+    try:
+        value = ast.literal_eval(literal)
+    except (ValueError, SyntaxError):
+        raise ValueError(f"Invalid value in condition: {condition!r}") from None
+    return lambda data: compare(get(data), value)
+
+
+class MessageFilter:
+    """
+    Subscription filter compiled once at subscribe time and applied to every message
+    before it is queued for the subscriber:
+
+    where:     condition(s) that must all hold, callables on message["data"] or strings
+               like "bms_state.soc < 20"
+    on_change: field paths; a message only passes when one of them changed since the
+               last message that passed the conditions (the first one always passes)
+    fields:    field paths to project; the subscriber gets {"type", "topic", "data"} with
+               "data" holding just {path: value}
+
+    Messages missing a field are filtered out.
+    """
+
+    def __init__(self, fields=None, where=None, on_change=None):
+        if where is None:
+            where = []
+        elif isinstance(where, str) or callable(where):
+            where = [where]
+        self.conditions = [compile_condition(condition) for condition in where]
+
+        self.change_fields = [compile_path(path) for path in (on_change or ())]
+        self.last_values = None
+
+        self.field_names = list(fields or ())
+        self.projection = [compile_path(path) for path in self.field_names]
+
+    @property
+    def active(self):
+        return bool(self.conditions or self.change_fields or self.projection)
+
+    def apply(self, message):
+        """The message to deliver (projected if `fields` were given), or None if filtered out."""
+        data = message.get("data")
+        try:
+            for condition in self.conditions:
+                if not condition(data):
+                    return None
+
+            if self.change_fields:
+                values = tuple(get(data) for get in self.change_fields)
+                if values == self.last_values:
+                    return None
+                self.last_values = values
+
+            if self.projection:
+                return {
+                    "type": message.get("type"),
+                    "topic": message.get("topic"),
+                    "data": {name: get(data) for name, get in zip(self.field_names, self.projection)},
+                }
+        except MISSING_FIELD_ERRORS:
+            return None
+        return message
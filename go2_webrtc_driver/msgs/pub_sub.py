@@ -1,35 +1,156 @@
 import asyncio
-import json
 import time
-import random
 import logging
-from ..constants import DATA_CHANNEL_TYPE
-from .future_resolver import FutureResolver
+from .. import json_codec
+from ..constants import CLIENT_TOPICS, DATA_CHANNEL_TYPE, RTC_TOPIC
+from .future_resolver import FutureResolver, DEFAULT_REQUEST_TIMEOUT
+from .latest_only import LatestOnlyDelivery
+from .subscription import Subscription, DEFAULT_QUEUE_SIZE
+from .rate_limit import RateLimit
+from .message_filter import MessageFilter
+from .latest_cache import LatestValueCache
+from .response_cache import ResponseCache, DEFAULT_MAX_ENTRIES
+from .topic_trie import TopicTrie, is_pattern, topic_matches
+from ..lidar.voxel_delta import VoxelDeltaStage
 from ..util import get_nested_field
 
+def typed_delivery(topic, callback):
+    """The callback wrapped to receive typed states, and the raw decoder of a typed subscription."""
+    # Imported here so msgspec is only needed for typed subscriptions
+    from .state_types import typed_callback, message_decoder
+    return typed_callback(topic, callback), message_decoder(topic)
+
+
 class WebRTCDataChannelPubSub:
 
     def __init__(self, channel):
         self.channel = channel
 
         self.future_resolver = FutureResolver()
-        self.subscriptions = {}  # Dictionary to hold callbacks keyed by topic
+        self.subscriptions = {}  # Lists of Subscription keyed by topic or topic pattern
+        self.topic_trie = TopicTrie()  # Subscriptions of topic patterns, see subscribe()
+        self.match_cache = {}  # Exact and pattern subscriptions of every topic seen
+        self.latest_only = {}  # Conflating deliveries keyed by topic, see subscribe(latest_only=True)
+        self.latest_cache = LatestValueCache()  # Newest message of every decoded topic, see get_latest()
+        self.response_cache = None  # Responses of read-only API requests, see enable_response_cache()
+        self.voxel_delta_interval = None  # Keyframe interval of the lidar delta output, see set_voxel_delta()
     
-    def run_resolve(self, message):
+    def run_resolve(self, message, targets=None, offer_latest_only=True, received=None, raw=None):
+        """
+        Resolve futures and queue the message for its subscribers. `targets` are the
+        subscriptions admit() accepted it for before decoding; None applies admit() now.
+        offer_latest_only=False is for messages a latest-only delivery already has.
+        `received` is the time.monotonic() the message arrived at, now if not given.
+        `raw` is the JSON text of a message decoded by raw_decoder(), which the latest-value
+        cache keeps instead of the typed message.
+        """
+        if received is None:
+            received = time.monotonic()
         self.future_resolver.run_resolve_for_topic(message)
 
          # Extract the topic from the message
         topic = message.get("topic")
-        if topic in self.subscriptions:
-            # Call the registered callback with the message
-            callback = self.subscriptions[topic]
-            callback(message)
+        if topic and message.get("type") == DATA_CHANNEL_TYPE["MSG"]:
+            self.latest_cache.update(topic, message, received, raw)
+        if offer_latest_only and topic in self.latest_only:
+            self.latest_only[topic].offer(message, received=received)
+
+        if targets is None:
+            targets = self.admit(topic, message)
+
+        # Queue the message for every subscriber, their tasks call the callbacks
+        for subscription in targets:
+            subscription.offer(message, received)
+
+    def admit(self, topic, raw, dispatch=None):
+        """
+        Subscriptions of `topic` whose rate limit lets this (possibly undecoded) message
+        through. `dispatch` is kept by time-bucketed subscriptions, see Subscription.admit().
+        """
+        subscriptions = self.subscriptions_for(topic)
+        if not subscriptions:
+            return ()
+        now = time.monotonic()
+        return [subscription for subscription in subscriptions if subscription.admit(now, raw, dispatch)]
+
+    def raw_decoder(self, message_type, topic, targets):
+        """
+        The decoder shared by every subscription a message goes to (see Subscription), when
+        nothing else needs the message decoded as a dict, or None to use the JSON codec.
+        """
+        if not targets or message_type != DATA_CHANNEL_TYPE["MSG"]:
+            return None
+        decoder = targets[0].raw_decoder
+        if decoder is None or any(subscription.raw_decoder is not decoder for subscription in targets):
+            return None
+        if (
+            topic in self.latest_only
+            or topic in self.latest_cache.tracked
+            or self.future_resolver.has_pending(message_type, topic)
+        ):
+            return None
+        return decoder
+
+    def subscriptions_for(self, topic):
+        """Subscriptions of a topic and of every pattern matching it, cached per topic."""
+        subscriptions = self.match_cache.get(topic)
+        if subscriptions is None:
+            subscriptions = tuple(self.subscriptions.get(topic, ())) + tuple(self.topic_trie.match(topic))
+            self.match_cache[topic] = subscriptions
+        return subscriptions
+
+    def add_subscription(self, topic, subscription):
+        subscription.voxel_delta = self.new_voxel_delta()
+        self.subscriptions.setdefault(topic, []).append(subscription)
+        if is_pattern(topic):
+            self.topic_trie.insert(topic, subscription)
+        self.match_cache.clear()
+
+    def remove_subscription(self, topic, subscription):
+        subscription.cancel()
+        self.subscriptions[topic].remove(subscription)
+        if not self.subscriptions[topic]:
+            del self.subscriptions[topic]
+        if is_pattern(topic):
+            self.topic_trie.remove(topic, subscription)
+        self.match_cache.clear()
+
+    def robot_topics(self, topic):
+        """
+        The topics to (un)subscribe on the robot: for a pattern, the known topics the robot
+        publishes that match it. Request and command topics (CLIENT_TOPICS) are left out.
+        """
+        if not is_pattern(topic):
+            return [topic]
+        topics = [
+            known for known in dict.fromkeys(RTC_TOPIC.values())
+            if known not in CLIENT_TOPICS and topic_matches(topic, known)
+        ]
+        logging.info("Topic pattern %s matches %s", topic, topics)
+        return topics
+
+    def has_listener(self, topic):
+        return bool(
+            self.subscriptions_for(topic)
+            or topic in self.latest_only
+            or topic in self.latest_cache.tracked
+        )
         
 
-    async def publish(self, topic, data=None, msg_type=None):
+    async def publish(self, topic, data=None, msg_type=None, timeout=None):
+        """
+        Send a message and wait for its response. Raises asyncio.TimeoutError when no
+        response arrived within `timeout` seconds (None waits indefinitely); cancelling the
+        awaiting task also forgets the request.
+        """
         channel = self.channel
         future = asyncio.get_event_loop().create_future()
 
+        # Requests without an id would be matched to any response on their topic
+        identity = get_nested_field(data, "header", "identity")
+        if isinstance(identity, dict) and not identity.get("id"):
+            identity["id"] = self.future_resolver.next_request_id()
+
         if channel.readyState == "open":
             message_dict = {
                 "type": msg_type or DATA_CHANNEL_TYPE["MSG"],
@@ -40,12 +161,12 @@ class WebRTCDataChannelPubSub:
                 message_dict["data"] = data
             
             # Convert the dictionary to a JSON string
-            message = json.dumps(message_dict)
+            message = json_codec.dumps(message_dict)
 
             channel.send(message)
 
             # Log the message being published
-            logging.info(f"> message sent: {message}")
+            logging.info("> message sent: %s", message)
 
             # Store the future so it can be completed when the response is received
             uuid = (
@@ -54,7 +175,7 @@ class WebRTCDataChannelPubSub:
                 get_nested_field(data, "req_uuid")
             )
 
-            self.future_resolver.save_resolve(msg_type or DATA_CHANNEL_TYPE["MSG"], topic, future, uuid)
+            self.future_resolver.save_resolve(msg_type or DATA_CHANNEL_TYPE["MSG"], topic, future, uuid, timeout)
         else:
             future.set_exception(Exception("Data channel is not open"))
 
@@ -74,20 +195,17 @@ class WebRTCDataChannelPubSub:
                 message_dict["data"] = data
             
             # Convert the dictionary to a JSON string
-            message = json.dumps(message_dict)
+            message = json_codec.dumps(message_dict)
                 
             self.channel.send(message)
 
             # Log the message being published
-            logging.info(f"> message sent: {message}")
+            logging.info("> message sent: %s", message)
         else:
             Exception("Data channel is not open")
         
 
-    async def publish_request_new(self, topic, options=None):
-        # Generate a unique identifier
-        generated_id = int(time.time() * 1000) % 2147483648 + random.randint(0, 1000)
-        
+    async def publish_request_new(self, topic, options=None, timeout=DEFAULT_REQUEST_TIMEOUT, cache=True):
         # Check if api_id is provided
         if not (options and "api_id" in options):
             print("Error: Please provide app id")
@@ -97,7 +215,7 @@ class WebRTCDataChannelPubSub:
         request_payload = {
             "header": {
                 "identity": {
-                    "id": options.get("id", generated_id),
+                    "id": options.get("id") or self.future_resolver.next_request_id(),
                     "api_id": options.get("api_id", 0)
                 }
             },
@@ -106,7 +224,7 @@ class WebRTCDataChannelPubSub:
 
         # Add data to parameter
         if options and "parameter" in options:
-            request_payload["parameter"] = options["parameter"] if isinstance(options["parameter"], str) else json.dumps(options["parameter"])
+            request_payload["parameter"] = options["parameter"] if isinstance(options["parameter"], str) else json_codec.dumps(options["parameter"])
 
         # Add priority if specified
         if options and "priority" in options:
@@ -114,29 +232,267 @@ class WebRTCDataChannelPubSub:
                 "priority": 1
             }
 
+        # Serve read-only APIs from the response cache when enabled, see enable_response_cache()
+        api_id = request_payload["header"]["identity"]["api_id"]
+        ttl = self.response_cache.ttl(topic, api_id) if self.response_cache and cache and "id" not in options else None
+        if ttl is not None:
+            key = (topic, api_id, request_payload["parameter"])
+            return await self.response_cache.fetch(
+                key, ttl, lambda: self.publish(topic, request_payload, DATA_CHANNEL_TYPE["REQUEST"], timeout)
+            )
+
         # Publish the request
-        return await self.publish(topic, request_payload, DATA_CHANNEL_TYPE["REQUEST"])
+        return await self.publish(topic, request_payload, DATA_CHANNEL_TYPE["REQUEST"], timeout)
+
+    async def request_many(self, requests, timeout=DEFAULT_REQUEST_TIMEOUT, limit=None, return_exceptions=True):
+        """
+        Send API requests concurrently and return their responses in the same order:
+
+            responses = await pub_sub.request_many([
+                (RTC_TOPIC["MOTION_SWITCHER"], {"api_id": 1001}),
+                (RTC_TOPIC["SPORT_MOD"], {"api_id": SPORT_CMD["GetState"]}),
+            ])
+
+        `requests` are (topic, options) pairs as taken by publish_request_new(). Every request
+        gets its own id, so each response resolves only its own request. At most `limit`
+        requests are in flight at once (None: all of them). A request that failed or timed
+        out is returned as its exception, or raised if return_exceptions is False.
+        """
+        semaphore = asyncio.Semaphore(limit) if limit else None
+
+        async def request(topic, options):
+            if semaphore is None:
+                return await self.publish_request_new(topic, options, timeout)
+            async with semaphore:
+                return await self.publish_request_new(topic, options, timeout)
+
+        return await asyncio.gather(
+            *(request(topic, options) for topic, options in requests),
+            return_exceptions=return_exceptions,
+        )
     
-    def subscribe(self, topic, callback=None):
+    def subscribe(self, topic, callback=None, latest_only=False, typed=False,
+                  maxsize=DEFAULT_QUEUE_SIZE, overflow="drop_oldest",
+                  max_hz=None, every_nth=1, bucket=None, fields=None, where=None, on_change=None,
+                  timestamped=False):
+        """
+        Subscribe to a topic; returns the subscription, to pass to unsubscribe().
+
+        A topic can have any number of subscribers. Each gets its own queue of at most
+        `maxsize` messages and delivery task, so the callback (sync or async) runs after the
+        message was dispatched, and never holds up the data channel or other subscribers.
+        `overflow` decides what happens when the queue is full: "drop_oldest" or
+        "drop_newest" (see msgs/subscription.py).
+
+        max_hz, every_nth and bucket limit the rate of messages the subscriber gets (see
+        msgs/rate_limit.py). Messages are rate limited before they are decoded, so a message
+        no subscriber takes is never parsed.
+
+        fields, where and on_change filter and project messages before they are queued (see
+        msgs/message_filter.py): e.g. where="bms_state.soc < 20", on_change=["mode"] or
+        fields=["mode", "position"], which delivers message["data"] as {"mode": ..., "position": ...}.
+
+        With latest_only=True the callback only ever gets the newest message: while it is
+        busy, newer messages replace the pending one, and binary (lidar) messages are only
+        decoded once the callback is ready for them. A topic has at most one latest-only
+        subscriber.
+
+        With typed=True message["data"] is a typed state object (see msgs/state_types.py),
+        available for the lowstate and sportmodestate topics. When every subscriber of the
+        topic is typed, messages are decoded straight into typed states, skipping the dicts.
+        Typed subscriptions need msgspec and cannot filter or project fields.
+
+        With timestamped=True the callback is called as callback(message, received), with
+        the time.monotonic() the message arrived at on the data channel, not the later time
+        it is delivered at.
+
+        `topic` can be a pattern: "*" matches one topic segment and a trailing "**" any
+        number of them, e.g. "rt/utlidar/*" or "rt/uslam/**". Every topic of RTC_TOPIC the
+        pattern matches is subscribed on the robot, except request and command topics (see
+        robot_topics()), so broad patterns can pull in heavy streams such as the lidar maps.
+        """
         channel = self.channel
 
         if not channel or channel.readyState != "open":
             print("Error: Data channel is not open")
             return
+
+        if latest_only and is_pattern(topic):
+            raise ValueError("Latest-only subscriptions need an exact topic")
+        raw_decoder = None
+        if typed:
+            if fields or where or on_change:
+                raise ValueError("Typed subscriptions cannot filter or project fields")
+            callback, raw_decoder = typed_delivery(topic, callback)
         
         # Register the callback for the topic
-        if callback:
-            self.subscriptions[topic] = callback
+        subscription = None
+        if callback and latest_only:
+            self.remove_latest_only(topic)
+            subscription = self.latest_only[topic] = LatestOnlyDelivery(topic, callback, timestamped)
+            subscription.voxel_delta = self.new_voxel_delta()
+        elif callback:
+            rate_limit = RateLimit(max_hz, every_nth, bucket)
+            message_filter = MessageFilter(fields, where, on_change)
+            subscription = Subscription(
+                topic, callback, maxsize, overflow, rate_limit, message_filter, raw_decoder, timestamped
+            )
+            self.add_subscription(topic, subscription)
+
+        for robot_topic in self.robot_topics(topic):
+            self.publish_without_callback(topic=robot_topic, msg_type=DATA_CHANNEL_TYPE["SUBSCRIBE"])
+        return subscription
+
+    async def stream(self, topic, maxsize=DEFAULT_QUEUE_SIZE, decimate=1, overflow="drop_oldest", typed=False):
+        """
+        Async iterator over the messages of a topic:
 
-        self.publish_without_callback(topic=topic, msg_type=DATA_CHANNEL_TYPE["SUBSCRIBE"])
+            async for message in pub_sub.stream(RTC_TOPIC["LOW_STATE"], maxsize=10, decimate=5):
+                ...
 
-    def unsubscribe(self, topic):
+        The topic is subscribed on the first iteration and unsubscribed when the loop exits.
+        Messages wait in a queue of `maxsize` (see subscribe() for `overflow`) until the
+        consumer pulls them; decimate=N only keeps every Nth message.
+        """
+        decode, raw_decoder = typed_delivery(topic, lambda message: message) if typed else (None, None)
+        subscription = self.open_stream(topic, maxsize, decimate, overflow, raw_decoder)
+        try:
+            while True:
+                message = await subscription.get()
+                yield decode(message) if decode else message
+        finally:
+            self.unsubscribe(topic, subscription)
+
+    async def stream_batches(self, topic, n, timeout=None, maxsize=DEFAULT_QUEUE_SIZE, decimate=1,
+                             overflow="drop_oldest", typed=False):
+        """
+        Like stream(), but yields lists of up to `n` messages: a batch is complete when it is
+        full or `timeout` seconds after its first message arrived, whichever comes first.
+        """
+        decode, raw_decoder = typed_delivery(topic, lambda message: message) if typed else (None, None)
+        subscription = self.open_stream(topic, max(maxsize, n), decimate, overflow, raw_decoder)
+        loop = asyncio.get_event_loop()
+        try:
+            while True:
+                batch = [await subscription.get()]
+                deadline = None if timeout is None else loop.time() + timeout
+                while len(batch) < n:
+                    remaining = None if deadline is None else deadline - loop.time()
+                    if remaining is not None and remaining <= 0:
+                        break
+                    try:
+                        batch.append(await asyncio.wait_for(subscription.get(), remaining))
+                    except asyncio.TimeoutError:
+                        break
+                yield [decode(message) for message in batch] if decode else batch
+        finally:
+            self.unsubscribe(topic, subscription)
+
+    def open_stream(self, topic, maxsize, decimate, overflow, raw_decoder=None):
+        if not self.channel or self.channel.readyState != "open":
+            raise Exception("Data channel is not open")
+        subscription = Subscription(topic, None, maxsize, overflow, RateLimit(every_nth=decimate), raw_decoder=raw_decoder)
+        self.add_subscription(topic, subscription)
+        for robot_topic in self.robot_topics(topic):
+            self.publish_without_callback(topic=robot_topic, msg_type=DATA_CHANNEL_TYPE["SUBSCRIBE"])
+        return subscription
+
+    def unsubscribe(self, topic, subscription=None):
+        """Remove one subscription, or all of the topic's; the robot stops sending once none are left."""
         channel = self.channel
 
         if not channel or channel.readyState != "open":
             print("Error: Data channel is not open")
             return
 
-        self.publish_without_callback(topic=topic, msg_type=DATA_CHANNEL_TYPE["UNSUBSCRIBE"])
+        if subscription is None:
+            for removed in list(self.subscriptions.get(topic, ())):
+                self.remove_subscription(topic, removed)
+            self.remove_latest_only(topic)
+        elif subscription is self.latest_only.get(topic):
+            self.remove_latest_only(topic)
+        elif subscription in self.subscriptions.get(topic, ()):
+            self.remove_subscription(topic, subscription)
+
+        for robot_topic in self.robot_topics(topic):
+            if not self.has_listener(robot_topic):
+                self.publish_without_callback(topic=robot_topic, msg_type=DATA_CHANNEL_TYPE["UNSUBSCRIBE"])
+
+    def remove_latest_only(self, topic):
+        delivery = self.latest_only.pop(topic, None)
+        if delivery is not None:
+            delivery.cancel()
+
+    def set_voxel_delta(self, keyframe_interval):
+        """
+        Deliver lidar voxel frames as the changes since the frame each subscriber got last,
+        with a keyframe every `keyframe_interval` frames (see VoxelDeltaStage), or as they
+        are with None. Every subscriber starts over with a keyframe.
+        """
+        self.voxel_delta_interval = keyframe_interval
+        for subscriptions in self.subscriptions.values():
+            for subscription in subscriptions:
+                subscription.voxel_delta = self.new_voxel_delta()
+        for delivery in self.latest_only.values():
+            delivery.voxel_delta = self.new_voxel_delta()
+
+    def new_voxel_delta(self):
+        if self.voxel_delta_interval is None:
+            return None
+        return VoxelDeltaStage(self.voxel_delta_interval)
+
+    def get_latest_only_stats(self, topic):
+        """Received, delivered and dropped (never decoded) message counts of a latest-only topic."""
+        delivery = self.latest_only.get(topic)
+        return delivery.stats() if delivery else None
+
+    
+
+    def get_subscription_stats(self, topic):
+        """Queue depth, drop and delivery counts of every queued subscriber of a topic."""
+        return [subscription.stats() for subscription in self.subscriptions.get(topic, ())]
+
+    def enable_response_cache(self, ttls=None, max_entries=DEFAULT_MAX_ENTRIES):
+        """
+        Cache the responses of read-only API requests made with publish_request_new().
+        `ttls` maps (topic, api_id) to seconds a response stays fresh and defaults to
+        DEFAULT_API_TTLS (motion switcher status, GetBodyHeight, GetSpeedLevel, GetState).
+        Identical requests in flight at the same time are sent once. Pass cache=False to
+        publish_request_new() to bypass the cache.
+        """
+        self.response_cache = ResponseCache(ttls, max_entries)
+        return self.response_cache
+
+    def disable_response_cache(self):
+        self.response_cache = None
+
+    def get_response_cache_stats(self):
+        return self.response_cache.stats() if self.response_cache else None
+
+    def get_pending_stats(self):
+        """Requests and chunked responses waiting for the robot, with their buffered bytes."""
+        return self.future_resolver.stats()
+
+    def get_latest(self, topic):
+        """
+        Newest message received on a topic as LatestValue(message, timestamp, sequence), or
+        None. `timestamp` is the time.monotonic() the message was received at on the data
+        channel. Only decoded messages are cached: subscribe to the topic or track() it; the
+        messages time-bucketed subscriptions hold back do not update the cache.
+        """
+        return self.latest_cache.get(topic)
+
+    def snapshot(self, topics=None):
+        """Consistent {topic: LatestValue or None} of several topics; messages are not copied."""
+        return self.latest_cache.snapshot(topics)
+
+    def track(self, topic):
+        """Subscribe to a topic only to keep its latest value, see get_latest()."""
+        self.latest_cache.tracked.add(topic)
+        self.subscribe(topic)
 
-    
\ No newline at end of file
+    def untrack(self, topic):
+        self.latest_cache.tracked.discard(topic)
+        self.latest_cache.clear(topic)
+        if not self.has_listener(topic):
+            self.unsubscribe(topic)
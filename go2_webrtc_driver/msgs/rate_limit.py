@@ -0,0 +1,42 @@
+class RateLimit:
+    """
+    Per-subscription rate limit, applied before a message is decoded.
+
+    max_hz:    at most `max_hz` messages per second; the first message after the interval
+               passes, the rest are dropped
+    every_nth: only every Nth message passes
+    bucket:    time-bucketed last value: messages are held back and only the last one of
+               every `bucket` seconds is delivered, when the bucket ends
+
+    max_hz and every_nth can be combined; a bucket replaces both.
+    """
+
+    def __init__(self, max_hz=None, every_nth=1, bucket=None):
+        if max_hz is not None and max_hz <= 0:
+            raise ValueError("max_hz must be positive")
+        if bucket is not None and bucket <= 0:
+            raise ValueError("bucket must be a positive number of seconds")
+
+        self.interval = 1.0 / max_hz if max_hz else 0.0
+        self.every_nth = max(int(every_nth), 1)
+        self.bucket = bucket
+        self.seen = 0
+        self.next_allowed = 0.0
+
+    @property
+    def active(self):
+        return self.interval > 0 or self.every_nth > 1 or self.bucket is not None
+
+    def accept(self, now):
+        """Whether a message received at `now` (time.monotonic()) passes max_hz and every_nth."""
+        self.seen += 1
+        if self.every_nth > 1 and (self.seen - 1) % self.every_nth:
+            return False
+        if self.interval:
+            if now < self.next_allowed:
+                return False
+            self.next_allowed = now + self.interval
+        return True
+
+    def bucket_end(self, now):
+        return (now // self.bucket + 1) * self.bucket
@@ -0,0 +1,94 @@
+import asyncio
+import collections
+import functools
+import time
+
+from ..constants import RTC_TOPIC, SPORT_CMD
+from ..util import get_nested_field
+
+DEFAULT_MAX_ENTRIES = 256
+
+# Seconds the response of a read-only API stays fresh, keyed by (topic, api_id)
+DEFAULT_API_TTLS = {
+    (RTC_TOPIC["MOTION_SWITCHER"], 1001): 1.0,  # Motion switcher status
+    (RTC_TOPIC["SPORT_MOD"], SPORT_CMD["GetBodyHeight"]): 0.5,
+    (RTC_TOPIC["SPORT_MOD"], SPORT_CMD["GetSpeedLevel"]): 0.5,
+    (RTC_TOPIC["SPORT_MOD"], SPORT_CMD["GetState"]): 0.2,
+}
+
+
+class ResponseCache:
+    """
+    Responses of idempotent API reads keyed by (topic, api_id, parameter), kept for the
+    API's TTL with least recently used entries evicted beyond `max_entries`.
+
+    Only APIs with a TTL are cached, and only successful responses (status code 0).
+    Identical requests made while one is in flight share its response instead of sending
+    their own. Cached responses are shared between callers and must not be modified.
+    """
+
+    def __init__(self, ttls=None, max_entries=DEFAULT_MAX_ENTRIES):
+        self.ttls = dict(DEFAULT_API_TTLS if ttls is None else ttls)
+        self.max_entries = max_entries
+        self.entries = collections.OrderedDict()  # key -> (expiry time.monotonic(), response)
+        self.in_flight = {}  # key -> task of the request on the wire
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evicted = 0
+
+    def ttl(self, topic, api_id):
+        return self.ttls.get((topic, api_id))
+
+    def set_ttl(self, topic, api_id, ttl):
+        """Cache an API's responses for `ttl` seconds; None stops caching it."""
+        if ttl is None:
+            self.ttls.pop((topic, api_id), None)
+        else:
+            self.ttls[(topic, api_id)] = ttl
+
+    async def fetch(self, key, ttl, request):
+        """The fresh cached response for `key`, or the response of `request()` (a coroutine function)."""
+        entry = self.entries.get(key)
+        if entry is not None:
+            if entry[0] > time.monotonic():
+                self.hits += 1
+                self.entries.move_to_end(key)
+                return entry[1]
+            del self.entries[key]
+
+        task = self.in_flight.get(key)
+        if task is not None:
+            self.coalesced += 1
+        else:
+            self.misses += 1
+            task = self.in_flight[key] = asyncio.ensure_future(request())
+            task.add_done_callback(functools.partial(self.store, key, ttl))
+        # A caller giving up must not cancel the request the others are waiting for
+        return await asyncio.shield(task)
+
+    def store(self, key, ttl, task):
+        self.in_flight.pop(key, None)
+        if task.cancelled() or task.exception() is not None:
+            return
+        response = task.result()
+        if get_nested_field(response, "data", "header", "status", "code") != 0:
+            return
+        self.entries[key] = (time.monotonic() + ttl, response)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+            self.evicted += 1
+
+    def clear(self):
+        self.entries.clear()
+
+    def stats(self):
+        return {
+            "entries": len(self.entries),
+            "in_flight": len(self.in_flight),
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "evicted": self.evicted,
+        }
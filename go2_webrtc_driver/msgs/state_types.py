@@ -0,0 +1,165 @@
+from typing import Optional, Tuple
+
+import numpy as np
+
+try:
+    import msgspec
+except ImportError:
+    raise ImportError("Typed state messages need msgspec: pip install msgspec") from None
+
+from .. import json_codec
+from ..constants import RTC_TOPIC
+
+# The motors as one structured array with a record per motor, see LowState.motor_array()
+MOTOR_STATE_DTYPE = np.dtype([
+    ("q", np.float64),
+    ("temperature", np.int16),
+    ("lost", np.uint32),
+])
+
+
+class TypedState(msgspec.Struct, gc=False):
+    """
+    Base of the typed state messages: msgspec structs, so attribute access only and no
+    per-instance dict. They are decoded straight from the JSON text (see message_decoder)
+    without building the nested dicts first. Fields missing from a message keep their
+    default and unknown fields are ignored.
+    """
+
+    def as_dict(self):
+        return msgspec.structs.asdict(self)
+
+
+class TimeStamp(TypedState):
+    sec: int = 0
+    nanosec: int = 0
+
+
+class MotorState(TypedState):
+    q: float = 0.0
+    temperature: int = 0
+    lost: int = 0
+
+
+class ImuState(TypedState):
+    quaternion: Tuple[float, ...] = ()
+    gyroscope: Tuple[float, ...] = ()
+    accelerometer: Tuple[float, ...] = ()
+    rpy: Tuple[float, ...] = ()
+    temperature: Optional[int] = None
+
+
+class BmsState(TypedState):
+    version_high: Optional[int] = None
+    version_low: Optional[int] = None
+    status: Optional[int] = None
+    soc: Optional[int] = None
+    current: Optional[int] = None
+    cycle: Optional[int] = None
+    bq_ntc: Tuple[int, ...] = ()
+    mcu_ntc: Tuple[int, ...] = ()
+
+
+class LowState(TypedState):
+    """Typed `rt/lf/lowstate` payload."""
+
+    imu_state: ImuState = msgspec.field(default_factory=ImuState)
+    motor_state: Tuple[MotorState, ...] = ()
+    bms_state: BmsState = msgspec.field(default_factory=BmsState)
+    foot_force: Tuple[int, ...] = ()
+    temperature_ntc1: Optional[int] = None
+    power_v: Optional[float] = None
+
+    def motor_array(self):
+        """The motors as a MOTOR_STATE_DTYPE structured array, e.g. motor_array()["q"]."""
+        return np.array([(motor.q, motor.temperature, motor.lost) for motor in self.motor_state], dtype=MOTOR_STATE_DTYPE)
+
+
+class SportModeState(TypedState):
+    """
+    Typed `rt/lf/sportmodestate` payload. foot_position_body and foot_speed_body are flat
+    like on the wire, x, y, z of one foot after the other.
+    """
+
+    stamp: TimeStamp = msgspec.field(default_factory=TimeStamp)
+    error_code: Optional[int] = None
+    imu_state: ImuState = msgspec.field(default_factory=ImuState)
+    mode: Optional[int] = None
+    progress: Optional[float] = None
+    gait_type: Optional[int] = None
+    foot_raise_height: Optional[float] = None
+    position: Tuple[float, ...] = ()
+    body_height: Optional[float] = None
+    velocity: Tuple[float, ...] = ()
+    yaw_speed: Optional[float] = None
+    range_obstacle: Tuple[float, ...] = ()
+    foot_force: Tuple[int, ...] = ()
+    foot_position_body: Tuple[float, ...] = ()
+    foot_speed_body: Tuple[float, ...] = ()
+
+
+class LowStateMessage(TypedState):
+    type: str
+    topic: str
+    data: LowState
+
+
+class SportModeStateMessage(TypedState):
+    type: str
+    topic: str
+    data: SportModeState
+
+
+# Topics with a typed state, see WebRTCDataChannelPubSub.subscribe(typed=True)
+TYPED_STATES = {
+    RTC_TOPIC["LOW_STATE"]: (LowState, LowStateMessage),
+    RTC_TOPIC["LF_SPORT_MOD_STATE"]: (SportModeState, SportModeStateMessage),
+    RTC_TOPIC["SPORT_MOD_STATE"]: (SportModeState, SportModeStateMessage),
+}
+
+
+def _typed_states(topic):
+    states = TYPED_STATES.get(topic)
+    if states is None:
+        raise ValueError(f"No typed decoder for topic {topic}")
+    return states
+
+
+def _message_decoder(message_type):
+    decoder = msgspec.json.Decoder(message_type)
+
+    def decode(raw):
+        try:
+            message = decoder.decode(raw)
+        except msgspec.DecodeError:
+            # e.g. NaN literals, which msgspec rejects: decode like the JSON codec does
+            message = msgspec.convert(json_codec.loads(raw), message_type)
+        return {"type": message.type, "topic": message.topic, "data": message.data}
+    return decode
+
+
+# One decoder per message type, shared by every typed subscription of its topics
+MESSAGE_DECODERS = {message_type: _message_decoder(message_type) for _state, message_type in TYPED_STATES.values()}
+
+
+def message_decoder(topic):
+    """Decoder of a topic's raw JSON text into a message whose "data" is the typed state."""
+    return MESSAGE_DECODERS[_typed_states(topic)[1]]
+
+
+def typed_callback(topic, callback):
+    """
+    Wrap `callback` so it receives the message with "data" as the topic's typed state.
+    Messages decoded with message_decoder() are passed on as they are; messages other
+    subscribers needed as dicts are converted. Further arguments, like the receive time
+    of timestamped subscriptions, are passed on too.
+    """
+    state_type = _typed_states(topic)[0]
+
+    def deliver(message, *args):
+        data = message["data"]
+        if not isinstance(data, state_type):
+            message = {**message, "data": msgspec.convert(data, state_type)}
+        return callback(message, *args)
+
+    return deliver
@@ -0,0 +1,178 @@
+import asyncio
+import inspect
+import logging
+import time
+
+OVERFLOW_POLICIES = ("drop_oldest", "drop_newest")
+DEFAULT_QUEUE_SIZE = 64
+
+
+class Subscription:
+    """
+    One subscriber of a topic, with its own bounded queue and delivery task.
+
+    Messages are queued by offer() and handed to the callback (sync or async) by a task of
+    its own, so a slow subscriber only delays itself. When the queue is full the overflow
+    policy applies: "drop_oldest" discards the oldest queued message, "drop_newest" the
+    incoming one. There is no blocking policy: the data channel (aiortc) runs every
+    incoming message in a task of its own, so waiting for room would not slow down the
+    robot, only pile up waiting tasks.
+
+    Without a callback nothing is delivered; the owner pulls messages with get() instead.
+
+    The rate limit (see RateLimit) is applied by admit(), which the data channel calls with
+    the still undecoded message, so messages every subscriber rejects are never decoded.
+    The message filter (see MessageFilter) is applied to decoded messages before they are
+    queued.
+
+    `raw_decoder` decodes the raw JSON text into the message the subscriber wants (see
+    state_types.message_decoder); the data channel uses it instead of the JSON codec when
+    it is shared by every subscriber a message goes to.
+
+    Messages are queued with the time.monotonic() they were received at; with `timestamped`
+    the callback is called as callback(message, received).
+
+    `voxel_delta` (see VoxelDeltaStage) turns lidar voxel frames into changes as they are
+    delivered, when the data channel's lidar output is "delta".
+    """
+
+    def __init__(self, topic, callback, maxsize=DEFAULT_QUEUE_SIZE, overflow="drop_oldest", rate_limit=None,
+                 message_filter=None, raw_decoder=None, timestamped=False):
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown overflow policy: {overflow}")
+        if maxsize < 1:
+            raise ValueError("Subscription queues need room for at least one message")
+
+        self.topic = topic
+        self.callback = callback
+        self.maxsize = maxsize
+        self.overflow = overflow
+        self.rate_limit = rate_limit if rate_limit is not None and rate_limit.active else None
+        self.message_filter = message_filter if message_filter is not None and message_filter.active else None
+        self.raw_decoder = raw_decoder
+        self.timestamped = timestamped
+        self.voxel_delta = None
+        self.queue = asyncio.Queue(maxsize)
+        self.task = None
+        self.bucket_pending = None
+        self.bucket_timer = None
+        self.received = 0
+        self.delivered = 0
+        self.dropped = 0
+        self.rate_limited = 0
+        self.filtered = 0
+        self.max_depth = 0
+
+    def admit(self, now, raw, dispatch=None):
+        """
+        Apply the rate limit to a message received at `now`. True means the decoded message
+        should be offered right away. A time-bucketed subscription keeps the newest `raw`
+        message and returns False; at the end of the bucket the message is handed to
+        `dispatch(raw, subscription, now)`, which decodes it and dispatches it to this
+        subscription like any other message, or offered as it is without a `dispatch`.
+        """
+        self.received += 1
+        rate_limit = self.rate_limit
+        if rate_limit is None:
+            return True
+
+        if rate_limit.bucket is None:
+            if rate_limit.accept(now):
+                return True
+            self.rate_limited += 1
+            return False
+
+        if self.bucket_pending is not None:
+            self.rate_limited += 1
+        self.bucket_pending = (raw, dispatch, now)
+        if self.bucket_timer is None:
+            loop = asyncio.get_event_loop()
+            self.bucket_timer = loop.call_later(rate_limit.bucket_end(now) - now, self._flush_bucket)
+        return False
+
+    def _flush_bucket(self):
+        self.bucket_timer = None
+        if self.bucket_pending is None:
+            return
+        (raw, dispatch, received), self.bucket_pending = self.bucket_pending, None
+        if dispatch is None:
+            self.offer(raw, received)
+        else:
+            asyncio.ensure_future(self._dispatch_held(dispatch, raw, received))
+
+    async def _dispatch_held(self, dispatch, raw, received):
+        try:
+            await dispatch(raw, self, received)
+        except Exception:
+            logging.error("Failed to dispatch held message for %s", self.topic, exc_info=True)
+
+    def offer(self, message, received=None):
+        """
+        Queue a message received at `received` (time.monotonic(), now if not given),
+        applying the overflow policy when the queue is full.
+        """
+        if self.message_filter is not None:
+            message = self.message_filter.apply(message)
+            if message is None:
+                self.filtered += 1
+                return
+
+        if self.callback is not None and (self.task is None or self.task.done()):
+            self.task = asyncio.ensure_future(self._deliver())
+
+        queue = self.queue
+        if queue.full():
+            self.dropped += 1
+            if self.overflow == "drop_newest":
+                return
+            queue.get_nowait()
+            queue.task_done()
+
+        queue.put_nowait((message, time.monotonic() if received is None else received))
+        self.max_depth = max(self.max_depth, queue.qsize())
+
+    async def get(self):
+        """Wait for the next queued message, for subscriptions without a callback."""
+        message, _received = await self.queue.get()
+        self.queue.task_done()
+        self.delivered += 1
+        if self.voxel_delta is not None:
+            message = self.voxel_delta.apply(message)
+        return message
+
+    async def _deliver(self):
+        while True:
+            message, received = await self.queue.get()
+            try:
+                if self.voxel_delta is not None:
+                    message = self.voxel_delta.apply(message)
+                result = self.callback(message, received) if self.timestamped else self.callback(message)
+                if inspect.isawaitable(result):
+                    await result
+                self.delivered += 1
+            except Exception:
+                logging.error("Error in subscriber callback for %s", self.topic, exc_info=True)
+            finally:
+                self.queue.task_done()
+
+    def cancel(self):
+        if self.task is not None:
+            self.task.cancel()
+            self.task = None
+        if self.bucket_timer is not None:
+            self.bucket_timer.cancel()
+            self.bucket_timer = None
+        self.bucket_pending = None
+
+    def stats(self):
+        return {
+            "depth": self.queue.qsize(),
+            "max_depth": self.max_depth,
+            "maxsize": self.maxsize,
+            "overflow": self.overflow,
+            "received": self.received,
+            "delivered": self.delivered,
+            "dropped": self.dropped,
+            "rate_limited": self.rate_limited,
+            "filtered": self.filtered,
+        }
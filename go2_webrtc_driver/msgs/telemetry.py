@@ -0,0 +1,217 @@
+import time
+import numpy as np
+
+from ..constants import RTC_TOPIC
+
+DEFAULT_CAPACITY = 2048
+
+
+def get(data, key):
+    """data[key], or the attribute `key` of a typed state (see msgs/state_types.py)."""
+    return data[key] if isinstance(data, dict) else getattr(data, key)
+
+
+def field(*path, keys=None):
+    """
+    Extractor for the value at `path` in message["data"], a dict or a typed state. With
+    `keys` the value is a dict and the listed keys are read in that order, e.g. a pose
+    position {"x", "y", "z"}.
+    """
+    def extract(data):
+        for key in path:
+            data = get(data, key)
+        if keys is not None:
+            return [data[key] for key in keys]
+        return data
+    return extract
+
+
+def motor_field(name):
+    """Extractor for one value of every motor in a lowstate message."""
+    def extract(data):
+        return [get(motor, name) for motor in get(data, "motor_state")]
+    return extract
+
+
+# Fields recorded by default: name -> (extractor, shape of one sample)
+TELEMETRY_FIELDS = {
+    RTC_TOPIC["LOW_STATE"]: {
+        "imu_rpy": (field("imu_state", "rpy"), (3,)),
+        "foot_force": (field("foot_force"), (4,)),
+        "motor_q": (motor_field("q"), (20,)),
+        "motor_temperature": (motor_field("temperature"), (20,)),
+        "soc": (field("bms_state", "soc"), ()),
+        "power_v": (field("power_v"), ()),
+    },
+    RTC_TOPIC["LF_SPORT_MOD_STATE"]: {
+        "position": (field("position"), (3,)),
+        "velocity": (field("velocity"), (3,)),
+        "yaw_speed": (field("yaw_speed"), ()),
+        "body_height": (field("body_height"), ()),
+        "imu_rpy": (field("imu_state", "rpy"), (3,)),
+        "imu_gyroscope": (field("imu_state", "gyroscope"), (3,)),
+        "imu_accelerometer": (field("imu_state", "accelerometer"), (3,)),
+        "foot_force": (field("foot_force"), (4,)),
+    },
+    RTC_TOPIC["ROBOTODOM"]: {
+        "position": (field("pose", "position", keys=("x", "y", "z")), (3,)),
+        "orientation": (field("pose", "orientation", keys=("x", "y", "z", "w")), (4,)),
+    },
+}
+
+
+class RingBuffer:
+    """
+    Fixed-capacity time series: a timestamp array and a value array of `shape` per sample,
+    overwritten oldest first. Timestamps must not decrease, so every query is a binary
+    search over the (at most two) contiguous runs of the buffer.
+    """
+
+    def __init__(self, capacity, shape=(), dtype=np.float64):
+        self.capacity = capacity
+        self.times = np.zeros(capacity, dtype=np.float64)
+        self.values = np.zeros((capacity,) + tuple(shape), dtype=dtype)
+        self.head = 0  # next slot to write
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    def append(self, timestamp, value):
+        if self.count and timestamp < self.times[self.head - 1]:
+            raise ValueError(f"Timestamp {timestamp} is older than the last sample")
+        self.times[self.head] = timestamp
+        self.values[self.head] = value
+        self.head = (self.head + 1) % self.capacity
+        self.count = min(self.count + 1, self.capacity)
+
+    def segments(self):
+        """The stored samples as up to two (times, values) views, oldest first."""
+        if self.count < self.capacity:
+            return [(self.times[:self.count], self.values[:self.count])]
+        if self.head == 0:
+            return [(self.times, self.values)]
+        return [
+            (self.times[self.head:], self.values[self.head:]),
+            (self.times[:self.head], self.values[:self.head]),
+        ]
+
+    def window(self, t0, t1):
+        """(times, values) of the samples with t0 <= timestamp <= t1, oldest first."""
+        times, values = [], []
+        for segment_times, segment_values in self.segments():
+            start = np.searchsorted(segment_times, t0, "left")
+            end = np.searchsorted(segment_times, t1, "right")
+            times.append(segment_times[start:end])
+            values.append(segment_values[start:end])
+        if len(times) == 1:
+            return times[0].copy(), values[0].copy()
+        return np.concatenate(times), np.concatenate(values)
+
+    def physical(self, index):
+        """Array index of the samples with logical (oldest first) `index`."""
+        start = self.head if self.count == self.capacity else 0
+        return (start + index) % self.capacity
+
+    def search(self, timestamps):
+        """Logical index of the first sample later than each timestamp (np.searchsorted "right")."""
+        segments = self.segments()
+        first = segments[0][0]
+        index = np.searchsorted(first, timestamps, "right")
+        if len(segments) == 2:
+            second = segments[1][0]
+            later = np.asarray(timestamps) >= second[0]
+            index = np.where(later, len(first) + np.searchsorted(second, timestamps, "right"), index)
+        return index
+
+    def interpolate(self, timestamps):
+        """
+        Values linearly interpolated at `timestamps` (a scalar or an array). Timestamps
+        outside the stored range get the oldest or newest sample.
+        """
+        if not self.count:
+            raise ValueError("No samples recorded")
+        timestamps = np.asarray(timestamps, dtype=np.float64)
+        after = np.clip(self.search(timestamps), 1, max(self.count - 1, 1))
+        before = after - 1
+        if self.count == 1:
+            after = before
+
+        t_before = self.times[self.physical(before)]
+        t_after = self.times[self.physical(after)]
+        v_before = self.values[self.physical(before)]
+        v_after = self.values[self.physical(after)]
+
+        span = t_after - t_before
+        weight = np.divide(timestamps - t_before, span, out=np.zeros_like(span), where=span > 0)
+        weight = np.clip(weight, 0.0, 1.0)
+        weight = weight.reshape(weight.shape + (1,) * (v_before.ndim - weight.ndim))
+        return v_before + (v_after - v_before) * weight
+
+    def latest(self):
+        if not self.count:
+            return None
+        last = (self.head - 1) % self.capacity
+        return self.times[last], self.values[last]
+
+
+class TelemetryStore:
+    """
+    Columnar history of telemetry topics: one RingBuffer per (topic, field), recorded with
+    the time.monotonic() each message was received at on the data channel, so a subscriber
+    queue backing up does not skew the timestamps.
+
+        store = TelemetryStore(capacity=2048)
+        store.attach(conn.datachannel.pub_sub, RTC_TOPIC["LOW_STATE"])
+        times, q = store.window(RTC_TOPIC["LOW_STATE"], "motor_q", t0, t1)
+        rpy = store.at(RTC_TOPIC["LOW_STATE"], "imu_rpy", time.monotonic() - 0.5)
+
+    Fields default to TELEMETRY_FIELDS; pass `fields` as {name: (extractor, shape)} for
+    other topics or fields.
+    """
+
+    def __init__(self, capacity=DEFAULT_CAPACITY):
+        self.capacity = capacity
+        self.buffers = {}
+        self.extractors = {}
+        self.errors = 0
+
+    def add_topic(self, topic, fields=None, capacity=None):
+        fields = fields if fields is not None else TELEMETRY_FIELDS.get(topic)
+        if not fields:
+            raise ValueError(f"No telemetry fields for topic {topic}")
+        capacity = capacity or self.capacity
+        self.extractors[topic] = [(name, extract) for name, (extract, _shape) in fields.items()]
+        self.buffers[topic] = {name: RingBuffer(capacity, shape) for name, (_extract, shape) in fields.items()}
+
+    def attach(self, pub_sub, topic, fields=None, capacity=None, **subscribe_options):
+        """Record `topic` from a pub_sub; subscribe_options are passed on to subscribe()."""
+        self.add_topic(topic, fields, capacity)
+        return pub_sub.subscribe(topic, self.record, timestamped=True, **subscribe_options)
+
+    def record(self, message, timestamp=None):
+        topic = message.get("topic")
+        buffers = self.buffers.get(topic)
+        if buffers is None:
+            return
+        timestamp = time.monotonic() if timestamp is None else timestamp
+        data = message["data"]
+        for name, extract in self.extractors[topic]:
+            try:
+                buffers[name].append(timestamp, extract(data))
+            except (KeyError, IndexError, TypeError, ValueError):
+                self.errors += 1
+
+    def buffer(self, topic, field_name):
+        return self.buffers[topic][field_name]
+
+    def window(self, topic, field_name, t0, t1):
+        """(times, values) of a field between t0 and t1 (time.monotonic() seconds), oldest first."""
+        return self.buffers[topic][field_name].window(t0, t1)
+
+    def at(self, topic, field_name, timestamps):
+        """A field's value interpolated at one or more timestamps."""
+        return self.buffers[topic][field_name].interpolate(timestamps)
+
+    def latest(self, topic, field_name):
+        return self.buffers[topic][field_name].latest()
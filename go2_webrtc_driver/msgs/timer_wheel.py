@@ -0,0 +1,93 @@
+import asyncio
+import logging
+import math
+
+DEFAULT_TICK = 0.1
+DEFAULT_SLOTS = 512
+
+
+class TimerWheel:
+    """
+    Hashed timing wheel for many deadlines on one loop timer.
+
+    Deadlines (loop.time() seconds) are hashed into `slots` buckets of `tick` seconds. While
+    anything is scheduled a single loop timer advances the wheel one tick at a time and
+    calls the callbacks of expired entries; deadlines more than one turn away stay in their
+    bucket until a later turn. Scheduling and cancelling are dict operations, so thousands
+    of pending requests cost one timer rather than a task or TimerHandle each. Callbacks
+    fire up to one tick late.
+    """
+
+    def __init__(self, tick=DEFAULT_TICK, slots=DEFAULT_SLOTS):
+        self.tick = tick
+        self.slots = [{} for _ in range(slots)]
+        self.entries = {}  # key -> slot index
+        self.current = None  # Number of the last tick processed, None while idle
+        self.handle = None
+        self.loop = None
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, key):
+        return key in self.entries
+
+    def schedule(self, key, deadline, callback):
+        """Call callback() at `deadline`; rescheduling a key replaces its previous deadline."""
+        self.cancel(key)
+        if self.loop is None:
+            self.loop = asyncio.get_event_loop()
+        if self.current is None:
+            self.current = int(self.loop.time() / self.tick)
+            self.handle = self.loop.call_at((self.current + 1) * self.tick, self._advance)
+
+        tick_number = max(math.ceil(deadline / self.tick), self.current + 1)
+        index = tick_number % len(self.slots)
+        self.slots[index][key] = (deadline, callback)
+        self.entries[key] = index
+
+    def deadline(self, key):
+        index = self.entries.get(key)
+        return None if index is None else self.slots[index][key][0]
+
+    def cancel(self, key):
+        index = self.entries.pop(key, None)
+        if index is not None:
+            del self.slots[index][key]
+
+    def clear(self):
+        if self.handle is not None:
+            self.handle.cancel()
+        self.handle = None
+        self.current = None
+        self.entries.clear()
+        for slot in self.slots:
+            slot.clear()
+
+    def _advance(self):
+        self.handle = None
+        now = self.loop.time()
+        target = int(now / self.tick)
+        # After a stall longer than a turn every bucket is due once, not once per turn
+        first = max(self.current + 1, target - len(self.slots) + 1)
+
+        expired = []
+        for tick_number in range(first, target + 1):
+            slot = self.slots[tick_number % len(self.slots)]
+            for key, (deadline, callback) in list(slot.items()):
+                if deadline <= now:
+                    del slot[key]
+                    del self.entries[key]
+                    expired.append(callback)
+        self.current = target
+
+        for callback in expired:
+            try:
+                callback()
+            except Exception:
+                logging.error("Error in timer callback", exc_info=True)
+
+        if not self.entries:
+            self.current = None
+        elif self.handle is None:
+            self.handle = self.loop.call_at((self.current + 1) * self.tick, self._advance)
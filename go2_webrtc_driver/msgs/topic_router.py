@@ -0,0 +1,79 @@
+import collections
+import re
+
+from ..constants import DATA_CHANNEL_TYPE
+
+# Messages start with their "type" and "topic" keys, e.g. {"type":"msg","topic":"rt/lf/lowstate",...}.
+# Only a header in exactly that position is trusted, anything else is fully parsed.
+HEADER_PATTERN = re.compile(
+    r'\s*\{\s*"type"\s*:\s*"([^"\\]*)"\s*,\s*"topic"\s*:\s*"([^"\\]*)"'
+    r'|\s*\{\s*"topic"\s*:\s*"([^"\\]*)"\s*,\s*"type"\s*:\s*"([^"\\]*)"'
+)
+
+
+def peek_header(message):
+    """Return (type, topic) of a JSON text message without parsing it, or None if unsure."""
+    match = HEADER_PATTERN.match(message)
+    if match is None:
+        return None
+    if match.group(1) is not None:
+        return match.group(1), match.group(2)
+    return match.group(4), match.group(3)
+
+
+class TopicRouter:
+    """
+    Decides from a message's type and topic alone whether it has to be decoded.
+
+    Only topic messages ("msg") can be skipped: they are needed when a subscriber takes
+    them after its rate limit, the topic is tracked by the latest-value cache, or a
+    latest-only delivery or pending future may be waiting for them. Every other type goes
+    to an internal handler (validation, heartbeat, errors, responses, ...) and is always
+    decoded. Skipped messages and bytes are counted, per topic too; `rate_limited` counts
+    those skipped only because of rate limits.
+    """
+
+    def __init__(self, pub_sub):
+        self.pub_sub = pub_sub
+        self.decoded = 0
+        self.skipped = 0
+        self.rate_limited = 0
+        self.skipped_bytes = 0
+        self.skipped_by_topic = collections.Counter()
+
+    def wants(self, message_type, topic):
+        """Whether the message is needed by anything else than a rate-limited subscriber."""
+        if message_type != DATA_CHANNEL_TYPE["MSG"]:
+            return True
+        pub_sub = self.pub_sub
+        return (
+            topic in pub_sub.latest_only
+            or topic in pub_sub.latest_cache.tracked
+            or pub_sub.future_resolver.has_pending(message_type, topic)
+        )
+
+    def route(self, message_type, topic, raw, size, dispatch=None):
+        """
+        Returns the subscriptions the message is admitted to (see pub_sub.admit) if it must
+        be decoded, or None if it is skipped. `raw` and `dispatch` are kept by time-bucketed
+        subscriptions to decode and dispatch the message later.
+        """
+        targets = self.pub_sub.admit(topic, raw, dispatch)
+        if targets or self.wants(message_type, topic):
+            self.decoded += 1
+            return targets
+        if self.pub_sub.subscriptions_for(topic):
+            self.rate_limited += 1
+        self.skipped += 1
+        self.skipped_bytes += size
+        self.skipped_by_topic[topic] += size
+        return None
+
+    def stats(self):
+        return {
+            "decoded": self.decoded,
+            "skipped": self.skipped,
+            "rate_limited": self.rate_limited,
+            "skipped_bytes": self.skipped_bytes,
+            "skipped_bytes_by_topic": dict(self.skipped_by_topic),
+        }
@@ -0,0 +1,94 @@
+SINGLE_WILDCARD = "*"
+MULTI_WILDCARD = "**"
+
+
+def is_pattern(topic):
+    return SINGLE_WILDCARD in topic
+
+
+def topic_matches(pattern, topic):
+    probe = TopicTrie()
+    probe.insert(pattern, True)
+    return bool(probe.match(topic))
+
+
+class TopicTrie:
+    """
+    Topic patterns split on "/" into a trie of segments. In a pattern "*" matches exactly
+    one segment and a trailing "**" one or more segments, so "rt/utlidar/*" matches
+    "rt/utlidar/voxel_map" and "rt/uslam/**" every topic below "rt/uslam".
+
+    match() walks the trie once per topic; callers cache its result per topic (see
+    WebRTCDataChannelPubSub.subscriptions_for) so it only runs for new topics.
+    """
+
+    def __init__(self):
+        self.root = TrieNode()
+
+    def insert(self, pattern, value):
+        node = self.root
+        segments = pattern.split("/")
+        for position, segment in enumerate(segments):
+            if segment == MULTI_WILDCARD:
+                if position != len(segments) - 1:
+                    raise ValueError(f"'{MULTI_WILDCARD}' is only allowed at the end of a pattern: {pattern}")
+                node.tail_values.append(value)
+                return
+            node = node.children.setdefault(segment, TrieNode())
+        node.values.append(value)
+
+    def remove(self, pattern, value):
+        """Remove a value inserted with `pattern`; empty branches are pruned."""
+        path = [self.root]
+        segments = pattern.split("/")
+        for segment in segments:
+            if segment == MULTI_WILDCARD:
+                break
+            node = path[-1].children.get(segment)
+            if node is None:
+                return
+            path.append(node)
+
+        values = path[-1].tail_values if segments[-1] == MULTI_WILDCARD else path[-1].values
+        if value in values:
+            values.remove(value)
+
+        for depth in range(len(path) - 1, 0, -1):
+            if not path[depth].empty():
+                break
+            del path[depth - 1].children[segments[depth - 1]]
+
+    def match(self, topic):
+        """Values of every pattern matching `topic`, in no particular order."""
+        matches = []
+        nodes = [self.root]
+        segments = topic.split("/")
+        for segment in segments:
+            next_nodes = []
+            for node in nodes:
+                # A trailing "**" matches whatever is left, at least this segment
+                matches.extend(node.tail_values)
+                child = node.children.get(segment)
+                if child is not None:
+                    next_nodes.append(child)
+                wildcard = node.children.get(SINGLE_WILDCARD)
+                if wildcard is not None:
+                    next_nodes.append(wildcard)
+            nodes = next_nodes
+            if not nodes:
+                return matches
+        for node in nodes:
+            matches.extend(node.values)
+        return matches
+
+
+class TrieNode:
+    __slots__ = ("children", "values", "tail_values")
+
+    def __init__(self):
+        self.children = {}
+        self.values = []  # values of patterns ending at this node
+        self.tail_values = []  # values of patterns ending with "**" below this node
+
+    def empty(self):
+        return not (self.children or self.values or self.tail_values)
@@ -1,10 +1,15 @@
 import asyncio
-import json
+import functools
+import inspect
 import logging
 import struct
 import sys
+import time
+from . import json_codec
 from .msgs.pub_sub import WebRTCDataChannelPubSub
+from .msgs.topic_router import TopicRouter, peek_header
 from .lidar.lidar_decoder import LidarDecoder
+from .lidar.decoder_pool import LidarDecoderPool, DEFAULT_MAX_IN_FLIGHT
 from .msgs.heartbeat import WebRTCDataChannelHeartBeat
 from .msgs.validation import WebRTCDataChannelValidaton
 from .msgs.rtc_inner_req import WebRTCDataChannelRTCInnerReq
@@ -13,15 +18,26 @@ from .msgs.error_handler import handle_error
 
 from .constants import DATA_CHANNEL_TYPE
 
-decoder = LidarDecoder()
+# Created on the first binary message, so processes that never receive lidar data skip it
+decoder = None
+
+def get_lidar_decoder():
+    global decoder
+    if decoder is None:
+        decoder = LidarDecoder()
+    return decoder
 
 class WebRTCDataChannel:
     def __init__(self, conn, pc) -> None:
         self.channel = pc.createDataChannel("data")
         self.data_channel_opened = False
         self.conn = conn
+        self.lidar_decoder_pool = None
+        self.lidar_decode_options = {}
 
         self.pub_sub = WebRTCDataChannelPubSub(self.channel)
+        self.router = TopicRouter(self.pub_sub)
+        self.dispatch_held_text = functools.partial(self.dispatch_held, json_codec.loads)
 
         self.heartbeat = WebRTCDataChannelHeartBeat(self.channel, self.pub_sub)
         self.validaton = WebRTCDataChannelValidaton(self.channel, self.pub_sub)
@@ -55,11 +71,14 @@ class WebRTCDataChannel:
             self.data_channel_opened = False
             self.heartbeat.stop_heartbeat()
             self.rtc_inner_req.network_status.stop_network_status_fetch()
+            self.disable_lidar_decoder_pool()
+            self.pub_sub.future_resolver.cancel_all(Exception("Data channel closed"))
             
         # Event handler for data channel messages
         @self.channel.on("message")
         async def on_message(message):
             logging.info("Received message on data channel: %s", message)
+            received = time.monotonic()
             try:
             
                 # Check if the message is not empty
@@ -67,22 +86,149 @@ class WebRTCDataChannel:
                     return
 
                 # Determine how to parse the 'data' field
+                targets = None
+                raw = None
                 if isinstance(message, str):
-                    parsed_data = json.loads(message)
+                    # Skip the full parse for topics nobody listens to or rate limits reject
+                    header = peek_header(message)
+                    if header is not None:
+                        targets = self.router.route(*header, message, len(message), self.dispatch_held_text)
+                        if targets is None:
+                            return
+                    # Typed subscribers get typed states decoded straight from the text,
+                    # which the latest-value cache keeps to decode as a dict when read
+                    decode = json_codec.loads
+                    raw_decoder = self.pub_sub.raw_decoder(*header, targets) if header is not None else None
+                    if raw_decoder is not None:
+                        decode, raw = raw_decoder, message
+                    try:
+                        parsed_data = decode(message)
+                    except json_codec.DecodeError:
+                        logging.error("Failed to decode JSON message: %s", message, exc_info=True)
+                        return
                 elif isinstance(message, bytes):
-                    parsed_data = WebRTCDataChannel.deal_array_buffer(message)
-                
-                # Resolve any pending futures or callbacks associated with this message
-                self.pub_sub.run_resolve(parsed_data)
+                    # Only the small JSON header is parsed here; the payload is decoded when
+                    # it is needed, and for latest-only topics when the subscriber is ready
+                    try:
+                        header, binary_data = WebRTCDataChannel.split_array_buffer(message)
+                    except json_codec.DecodeError:
+                        logging.error("Failed to decode the JSON header of a %d byte binary message", len(message), exc_info=True)
+                        return
+                    topic = header.get("topic")
+                    decode = functools.partial(self.decode_binary_message, header=header, binary_data=binary_data)
+                    targets = self.router.route(
+                        header.get("type"), topic, message, len(message), functools.partial(self.dispatch_held, decode)
+                    )
+                    if targets is None:
+                        return
+
+                    latest = self.pub_sub.latest_only.get(topic)
+                    if latest is not None and not targets and topic not in self.pub_sub.latest_cache.tracked:
+                        latest.offer(message, functools.partial(self.decode_latest_only, decode), received)
+                        return
 
-                # Handle the response
-                await self.handle_response(parsed_data)
+                    if self.lidar_decoder_pool is not None:
+                        # Decoded off the event loop, dispatched in arrival order when ready
+                        self.lidar_decoder_pool.submit(
+                            message, functools.partial(self.schedule_dispatch, targets=targets, received=received)
+                        )
+                        return
+                    parsed_data = WebRTCDataChannel.decode_array_buffer(header, binary_data, **self.lidar_decode_options)
+
+                await self.dispatch_message(parsed_data, targets, received=received, raw=raw)
         
-            except json.JSONDecodeError:
-                logging.error("Failed to decode JSON message: %s", message, exc_info=True)
             except Exception as error:
                 logging.error("Error processing WebRTC data", exc_info=True)
 
+    async def dispatch_message(self, parsed_data, targets=None, offer_latest_only=True, received=None, raw=None):
+        # Resolve any pending futures or callbacks associated with this message
+        self.pub_sub.run_resolve(parsed_data, targets, offer_latest_only, received, raw)
+
+        # Handle the response
+        await self.handle_response(parsed_data)
+
+    async def decode_binary_message(self, message, header=None, binary_data=None):
+        """
+        Decode a binary message, in the decoder pool when it is enabled. `header` and
+        `binary_data` are the message already split by split_array_buffer, if it was.
+        """
+        if self.lidar_decoder_pool is not None:
+            return await self.lidar_decoder_pool.decode(message)
+        if header is None:
+            header, binary_data = WebRTCDataChannel.split_array_buffer(message)
+        return WebRTCDataChannel.decode_array_buffer(header, binary_data, **self.lidar_decode_options)
+
+    async def decode_latest_only(self, decode, message, received=None):
+        """
+        Decode a frame once its latest-only subscriber is ready for it, and dispatch it like
+        any other message so futures and the latest-value cache see it too.
+        """
+        parsed_data = await decode(message)
+        await self.dispatch_message(parsed_data, (), offer_latest_only=False, received=received)
+        return parsed_data
+
+    async def dispatch_held(self, decode, message, subscription, received=None):
+        """
+        Decode a message a time-bucketed subscription held back (see Subscription.admit) and
+        deliver it to that subscription only. Futures and the latest-value cache already
+        had their chance when the message arrived, and have newer messages by now.
+        """
+        parsed_data = decode(message)
+        if inspect.isawaitable(parsed_data):
+            parsed_data = await parsed_data
+        subscription.offer(parsed_data, received)
+
+    def schedule_dispatch(self, parsed_data, targets=None, received=None):
+        asyncio.ensure_future(self._dispatch_safely(parsed_data, targets, received))
+
+    async def _dispatch_safely(self, parsed_data, targets=None, received=None):
+        try:
+            await self.dispatch_message(parsed_data, targets, received=received)
+        except Exception:
+            logging.error("Error processing WebRTC data", exc_info=True)
+
+    def enable_lidar_decoder_pool(self, workers=2, max_in_flight=DEFAULT_MAX_IN_FLIGHT):
+        """
+        Decode binary (lidar) messages in `workers` separate processes instead of on the
+        event loop; beyond `max_in_flight` waiting frames the oldest one is dropped.
+        """
+        self.disable_lidar_decoder_pool()
+        decode_fn = functools.partial(WebRTCDataChannel.deal_array_buffer, **self.lidar_decode_options)
+        self.lidar_decoder_pool = LidarDecoderPool(decode_fn, workers, warmup_fn=get_lidar_decoder,
+                                                   max_in_flight=max_in_flight)
+
+    def disable_lidar_decoder_pool(self):
+        if self.lidar_decoder_pool is not None:
+            self.lidar_decoder_pool.close()
+            self.lidar_decoder_pool = None
+
+    def get_lidar_decoder_pool_stats(self):
+        """In-flight, submitted and dropped frame counts of the decoder pool, or None when disabled."""
+        return self.lidar_decoder_pool.stats() if self.lidar_decoder_pool is not None else None
+
+    def get_routing_stats(self):
+        """Decoded and skipped (never decoded) message counts and skipped bytes, see TopicRouter."""
+        return self.router.stats()
+
+    def set_lidar_output(self, output="mesh", dedup=False, keyframe_interval=30):
+        """
+        Choose what decoded lidar messages carry in message["data"]["data"]: the raw mesh
+        ("mesh", default), world-frame float32 XYZ points ("points"), the grid coordinates
+        of the occupied voxels ("voxels"), see LidarDecoder.decode, or only the voxels
+        added and removed since the previous frame each subscriber got ("delta"), see
+        VoxelDeltaStage. In delta mode get_latest() and futures still get the voxels.
+        """
+        if output not in ("mesh", "points", "voxels", "delta"):
+            raise ValueError(f"Unknown lidar output mode: {output}")
+        self.pub_sub.set_voxel_delta(keyframe_interval if output == "delta" else None)
+        if output == "delta":
+            output = "voxels"
+        self.lidar_decode_options = {"output": output, "dedup": dedup} if output != "mesh" else {}
+
+        # Workers received the previous options when they were started
+        if self.lidar_decoder_pool is not None:
+            self.enable_lidar_decoder_pool(self.lidar_decoder_pool.workers, self.lidar_decoder_pool.max_in_flight)
+
 
     async def handle_response(self, msg: dict):
         msg_type = msg["type"]
@@ -113,36 +259,45 @@ class WebRTCDataChannel:
             await asyncio.sleep(0.1)
     
     @staticmethod
-    def deal_array_buffer(buffer):
+    def deal_array_buffer(buffer, **decode_options):
+        decoded_json, binary_data = WebRTCDataChannel.split_array_buffer(buffer)
+        return WebRTCDataChannel.decode_array_buffer(decoded_json, binary_data, **decode_options)
+    @staticmethod
+    def split_array_buffer(buffer):
+        """Parse only the JSON header of a binary message, returns (header, compressed data)."""
         header_1, header_2 = struct.unpack_from('<HH', buffer, 0)
         if header_1 == 2 and header_2 == 0:
-            return WebRTCDataChannel.deal_array_buffer_for_lidar(buffer[4:])
+            return WebRTCDataChannel.split_array_buffer_for_lidar(buffer[4:])
         else:
-            return WebRTCDataChannel.deal_array_buffer_for_normal(buffer)
+            return WebRTCDataChannel.split_array_buffer_for_normal(buffer)
     @staticmethod
-    def deal_array_buffer_for_normal(buffer):
+    def split_array_buffer_for_normal(buffer):
         header_length, = struct.unpack_from('<H', buffer, 0)
         json_data = buffer[4:4 + header_length]
         binary_data = buffer[4 + header_length:]
 
-        decoded_json = json.loads(json_data.decode('utf-8'))
-
-        decoded_data = decoder.decode(binary_data, decoded_json['data'])
-
-        decoded_json['data']['data'] = decoded_data
-        return decoded_json
+        return json_codec.loads(json_data), binary_data
     @staticmethod
-    def deal_array_buffer_for_lidar(buffer):
+    def split_array_buffer_for_lidar(buffer):
         header_length, = struct.unpack_from('<I', buffer, 0)
         json_data = buffer[8:8 + header_length]
         binary_data = buffer[8 + header_length:]
 
-        decoded_json = json.loads(json_data.decode('utf-8'))
-
-        decoded_data = decoder.decode(binary_data, decoded_json['data'])
+        return json_codec.loads(json_data), binary_data
+    @staticmethod
+    def decode_array_buffer(decoded_json, binary_data, **decode_options):
+        decoded_data = get_lidar_decoder().decode(binary_data, decoded_json['data'], **decode_options)
 
         decoded_json['data']['data'] = decoded_data
         return decoded_json
+    @staticmethod
+    def deal_array_buffer_for_normal(buffer, **decode_options):
+        decoded_json, binary_data = WebRTCDataChannel.split_array_buffer_for_normal(buffer)
+        return WebRTCDataChannel.decode_array_buffer(decoded_json, binary_data, **decode_options)
+    @staticmethod
+    def deal_array_buffer_for_lidar(buffer, **decode_options):
+        decoded_json, binary_data = WebRTCDataChannel.split_array_buffer_for_lidar(buffer)
+        return WebRTCDataChannel.decode_array_buffer(decoded_json, binary_data, **decode_options)
 
     
     #Should turn it on when subscribed to ulidar topic
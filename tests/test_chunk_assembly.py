@@ -0,0 +1,123 @@
+import asyncio
+
+import pytest
+
+from go2_webrtc_driver.msgs.chunk_assembly import ChunkAssembly
+from go2_webrtc_driver.msgs.future_resolver import FutureResolver
+
+PAYLOAD = bytes(range(256)) * 4 + b"tail"
+
+
+def chunks(payload, size):
+    return [payload[start:start + size] for start in range(0, len(payload), size)]
+
+
+def assemble(order, total_size=None, size=100):
+    parts = chunks(PAYLOAD, size)
+    assembly = ChunkAssembly(len(parts), total_size)
+    for index in order(len(parts)):
+        assembly.add(index, parts[index - 1])
+    return assembly
+
+
+def test_in_order():
+    assembly = assemble(lambda n: range(1, n + 1))
+    assert assembly.complete
+    payload = assembly.finish()
+    assert type(payload) is bytearray and payload == PAYLOAD
+
+
+def test_out_of_order_last_chunk_first():
+    assembly = assemble(lambda n: [n] + list(range(n - 1, 0, -1)))
+    assert assembly.finish() == PAYLOAD
+
+
+def test_out_of_order_with_total_size():
+    assembly = assemble(lambda n: [3, n, 1] + list(range(2, n)), total_size=len(PAYLOAD))
+    assert assembly.allocated == len(PAYLOAD)
+    assert assembly.finish() == PAYLOAD
+
+
+def test_duplicates_are_ignored():
+    parts = chunks(PAYLOAD, 100)
+    assembly = ChunkAssembly(len(parts))
+    assert assembly.add(1, parts[0])
+    assert not assembly.add(1, parts[0])
+    for index in range(2, len(parts) + 1):
+        assembly.add(index, parts[index - 1])
+    assert not assembly.add(len(parts), parts[-1])
+    assert assembly.count == len(parts)
+    assert assembly.finish() == PAYLOAD
+
+
+def test_single_chunk_is_not_copied():
+    chunk = b"abc"
+    assembly = ChunkAssembly(1)
+    assembly.add(1, chunk)
+    assert assembly.finish() is chunk
+
+
+def test_incomplete_and_invalid_chunks():
+    assembly = ChunkAssembly(3)
+    assembly.add(1, b"aaaa")
+    with pytest.raises(ValueError):
+        assembly.finish()
+    with pytest.raises(ValueError):
+        assembly.add(4, b"aaaa")
+    with pytest.raises(ValueError):
+        assembly.add(2, b"aa")
+    with pytest.raises(ValueError):
+        ChunkAssembly(0)
+
+
+def test_resolver_returns_the_payload():
+    async def main():
+        resolver = FutureResolver()
+        parts = chunks(PAYLOAD, 300)
+        results = [resolver.store_chunk("key", index, len(parts), parts[index - 1]) for index in (2, 4, 1, 1)]
+        assert results == [None, None, None, None]
+        assert resolver.stats()["duplicate_chunks"] == 1
+        payload = resolver.store_chunk("key", 3, len(parts), parts[2])
+        assert type(payload) is bytearray and payload == PAYLOAD
+        assert resolver.stats()["pending_chunk_sets"] == 0
+        assert resolver.store_chunk("single", 1, 1, b"x") == b"x"
+
+    asyncio.run(main())
+
+
+def test_invalid_chunks_fail_the_waiting_futures():
+    async def main():
+        resolver = FutureResolver()
+        future = asyncio.get_event_loop().create_future()
+        resolver.save_resolve("req", "topic", future, "key", timeout=10)
+        parts = chunks(PAYLOAD, 300)
+        resolver.store_chunk("key", 1, len(parts), parts[0])
+        with pytest.raises(ValueError):
+            resolver.store_chunk("key", 2, len(parts), parts[1][:10])
+
+        with pytest.raises(ValueError):
+            await asyncio.wait_for(future, 1)
+        stats = resolver.stats()
+        assert stats["pending_requests"] == 0 and stats["pending_chunk_sets"] == 0
+        assert stats["deadlines"] == 0
+
+    asyncio.run(main())
+
+
+def test_payload_size_mismatch_fails_the_waiting_futures():
+    async def main():
+        resolver = FutureResolver()
+        future = asyncio.get_event_loop().create_future()
+        resolver.save_resolve("req", "topic", future, "key", timeout=10)
+        parts = chunks(PAYLOAD, 300)
+        for index in range(1, len(parts)):
+            resolver.store_chunk("key", index, len(parts), parts[index - 1], total_size=len(PAYLOAD) + 8)
+        # Only finish() finds out the chunks are short of the announced size
+        with pytest.raises(ValueError):
+            resolver.store_chunk("key", len(parts), len(parts), parts[-1], total_size=len(PAYLOAD) + 8)
+
+        with pytest.raises(ValueError):
+            await asyncio.wait_for(future, 1)
+        assert resolver.stats()["pending_requests"] == 0
+
+    asyncio.run(main())
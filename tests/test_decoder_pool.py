@@ -0,0 +1,36 @@
+import asyncio
+import time
+
+from go2_webrtc_driver.lidar.decoder_pool import LidarDecoderPool
+
+
+def slow_decode(buffer):
+    time.sleep(0.02)
+    return buffer
+
+
+def test_frames_beyond_max_in_flight_are_dropped_oldest_first():
+    async def main():
+        pool = LidarDecoderPool(slow_decode, workers=1, max_in_flight=2)
+        try:
+            # Let the worker start before the burst
+            assert await pool.decode(-1) == -1
+            delivered = []
+            for frame in range(20):
+                pool.submit(frame, delivered.append)
+                assert pool.in_flight <= 2
+            for _ in range(100):
+                if not pool.pending:
+                    break
+                await asyncio.sleep(0.02)
+
+            stats = pool.stats()
+            assert stats["submitted"] == 20
+            assert stats["dropped"] == 20 - len(delivered)
+            assert stats["dropped"] >= 17
+            assert delivered == sorted(delivered) and delivered[-1] == 19
+            assert stats["in_flight"] == 0
+        finally:
+            pool.close()
+
+    asyncio.run(main())
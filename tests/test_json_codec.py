@@ -0,0 +1,36 @@
+import math
+
+import pytest
+
+from go2_webrtc_driver import json_codec
+
+NON_FINITE = '{"type": "msg", "topic": "rt/lf/sportmodestate", "data": {"mode": 1, "yaw_speed": NaN, "velocity": [Infinity, -Infinity, 0]}}'
+
+
+@pytest.fixture(params=json_codec.available_codecs())
+def codec(request):
+    previous = json_codec.codec
+    json_codec.set_codec(request.param)
+    yield request.param
+    json_codec.set_codec(previous)
+
+
+def test_non_finite_literals_decode_with_every_codec(codec):
+    for payload in (NON_FINITE, NON_FINITE.encode(), memoryview(NON_FINITE.encode())):
+        data = json_codec.loads(payload)["data"]
+        assert math.isnan(data["yaw_speed"])
+        assert data["velocity"] == [math.inf, -math.inf, 0]
+
+
+def test_malformed_input_still_raises(codec):
+    with pytest.raises(json_codec.DecodeError):
+        json_codec.loads('{"type": ')
+    with pytest.raises(json_codec.DecodeError):
+        json_codec.loads(b'{"type": "\xff"}')
+
+
+def test_typed_decoder_accepts_non_finite_literals():
+    state_types = pytest.importorskip("go2_webrtc_driver.msgs.state_types")
+    message = state_types.message_decoder("rt/lf/sportmodestate")(NON_FINITE)
+    assert math.isnan(message["data"].yaw_speed)
+    assert message["data"].velocity[:2] == (math.inf, -math.inf)
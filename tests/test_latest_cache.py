@@ -0,0 +1,91 @@
+import asyncio
+import json
+import time
+
+from go2_webrtc_driver.constants import DATA_CHANNEL_TYPE, RTC_TOPIC
+from go2_webrtc_driver.msgs.latest_cache import LatestValueCache
+from go2_webrtc_driver.webrtc_datachannel import WebRTCDataChannel
+
+TOPIC = RTC_TOPIC["LF_SPORT_MOD_STATE"]
+
+
+class FakeChannel:
+    readyState = "open"
+
+    def __init__(self):
+        self.handlers = {}
+        self.sent = []
+
+    def on(self, event):
+        def register(handler):
+            self.handlers[event] = handler
+            return handler
+        return register
+
+    def send(self, message):
+        self.sent.append(message)
+
+
+class FakePeerConnection:
+    def __init__(self):
+        self.channel = FakeChannel()
+
+    def createDataChannel(self, label):
+        return self.channel
+
+
+def make_datachannel():
+    pc = FakePeerConnection()
+    return WebRTCDataChannel(None, pc), pc.channel
+
+
+def state(mode):
+    return json.dumps({"type": DATA_CHANNEL_TYPE["MSG"], "topic": TOPIC, "data": {"mode": mode}})
+
+
+def test_entries_are_stamped_with_the_monotonic_clock():
+    cache = LatestValueCache()
+    before = time.monotonic()
+    cache.update("topic", {"data": 1})
+    cache.update("other", {"data": 2}, timestamp=12.5)
+    assert before <= cache.get("topic").timestamp <= time.monotonic()
+    assert cache.get("other").timestamp == 12.5
+    assert cache.get("other").sequence == 0
+
+
+def test_latest_value_carries_the_receive_time():
+    async def main():
+        datachannel, channel = make_datachannel()
+        datachannel.pub_sub.track(TOPIC)
+        before = time.monotonic()
+        await channel.handlers["message"](state(1))
+        after = time.monotonic()
+
+        latest = datachannel.pub_sub.get_latest(TOPIC)
+        assert latest.message["data"] == {"mode": 1}
+        assert before <= latest.timestamp <= after
+
+    asyncio.run(main())
+
+
+def test_held_messages_do_not_update_the_cache_again():
+    async def main():
+        datachannel, channel = make_datachannel()
+        pub_sub = datachannel.pub_sub
+        every = []
+        bucketed = []
+        pub_sub.subscribe(TOPIC, every.append)
+        pub_sub.subscribe(TOPIC, bucketed.append, bucket=0.05)
+
+        for mode in (1, 2):
+            await channel.handlers["message"](state(mode))
+        latest = pub_sub.get_latest(TOPIC)
+        assert latest.message["data"] == {"mode": 2} and latest.sequence == 1
+
+        await asyncio.sleep(0.1)
+        assert [message["data"]["mode"] for message in bucketed] == [2]
+        assert len(every) == 2
+        # The held message was delivered, not cached a second time
+        assert pub_sub.get_latest(TOPIC) is latest
+
+    asyncio.run(main())
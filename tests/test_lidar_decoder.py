@@ -0,0 +1,82 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("wasmtime")
+lz4_block = pytest.importorskip("lz4.block")
+
+from go2_webrtc_driver.lidar import lidar_decoder
+from go2_webrtc_driver.lidar.lidar_decoder import LidarDecoder
+
+
+def make_frame(density, seed=0):
+    rng = np.random.default_rng(seed)
+    occupancy = rng.random((30, 128, 128)) < density
+    occupancy[0] = True
+    bitmap = np.packbits(occupancy.reshape(-1)).tobytes()
+    header = {"resolution": 0.05, "src_size": len(bitmap), "origin": [-3.2, -3.2, -0.575]}
+    return lz4_block.compress(bitmap, store_size=False), header
+
+
+@pytest.fixture(scope="module")
+def reference():
+    return LidarDecoder()
+
+
+@pytest.fixture
+def small_decoder(monkeypatch):
+    monkeypatch.setattr(lidar_decoder, "INITIAL_INPUT_SIZE", 256)
+    monkeypatch.setattr(lidar_decoder, "INITIAL_DECOMPRESS_SIZE", 256)
+    monkeypatch.setattr(lidar_decoder, "INITIAL_FACE_CAPACITY", 100)
+    return LidarDecoder()
+
+
+def assert_same_mesh(result, expected):
+    assert result["face_count"] == expected["face_count"]
+    for key in ("positions", "uvs", "indices"):
+        np.testing.assert_array_equal(result[key], expected[key])
+
+
+def test_buffers_grow_for_larger_frames(small_decoder, reference):
+    compressed, header = make_frame(0.3)
+    result = small_decoder.decode(compressed, header)
+    assert_same_mesh(result, reference.decode(compressed, header))
+
+    stats = small_decoder.buffer_stats()
+    assert stats["high_water"]["faces"] == result["face_count"]
+    assert stats["capacity"]["faces"] >= result["face_count"]
+    assert stats["capacity"]["input"] >= len(compressed)
+    assert stats["capacity"]["decompress"] >= header["src_size"]
+
+
+def test_decompress_buffer_grows_by_retrying_without_src_size(small_decoder, reference):
+    compressed, header = make_frame(0.05, seed=1)
+    header = {key: value for key, value in header.items() if key != "src_size"}
+    result = small_decoder.decode(compressed, header)
+    assert_same_mesh(result, reference.decode(compressed, header))
+    assert small_decoder.buffer_stats()["capacity"]["decompress"] >= 30 * 128 * 128 // 8
+
+
+def test_sparse_frame_without_src_size(small_decoder, reference):
+    # Compresses far better than the first retries assume
+    compressed, header = make_frame(0.0, seed=1)
+    header = {key: value for key, value in header.items() if key != "src_size"}
+    assert_same_mesh(small_decoder.decode(compressed, header), reference.decode(compressed, header))
+
+
+def test_corrupt_frame_raises(small_decoder):
+    compressed, header = make_frame(0.05, seed=1)
+    with pytest.raises(ValueError):
+        small_decoder.decode(compressed[:len(compressed) // 2], header)
+
+
+def test_buffers_are_reused_across_frames(small_decoder, reference):
+    dense = make_frame(0.3, seed=2)
+    # The first frames grow the buffers, with headroom above the largest one
+    small_decoder.decode(*dense)
+    small_decoder.decode(*dense)
+    capacity = small_decoder.buffer_stats()["capacity"]
+
+    for seed in range(3, 6):
+        frame = make_frame(0.1, seed=seed)
+        assert_same_mesh(small_decoder.decode(*frame), reference.decode(*frame))
+    assert small_decoder.buffer_stats()["capacity"] == capacity
@@ -0,0 +1,68 @@
+import asyncio
+
+import pytest
+
+from go2_webrtc_driver.msgs.message_filter import MessageFilter
+from go2_webrtc_driver.msgs.subscription import Subscription
+
+
+def message(**data):
+    return {"type": "msg", "topic": "rt/test", "data": data}
+
+
+def test_where():
+    low_battery = MessageFilter(where="bms_state.soc < 20")
+    assert low_battery.active
+    assert low_battery.apply(message(bms_state={"soc": 15})) is not None
+    assert low_battery.apply(message(bms_state={"soc": 50})) is None
+    assert low_battery.apply(message(mode=1)) is None  # Missing field
+
+    both = MessageFilter(where=["mode == 1", lambda data: data["position"][2] > 0.2])
+    assert both.apply(message(mode=1, position=[0, 0, 0.3])) is not None
+    assert both.apply(message(mode=1, position=[0, 0, 0.1])) is None
+
+
+def test_on_change():
+    changes = MessageFilter(on_change=["mode", "position.0"])
+    passed = [
+        changes.apply(message(mode=mode, position=[x])) is not None
+        for mode, x in ((1, 0.0), (1, 0.0), (2, 0.0), (2, 0.5), (2, 0.5))
+    ]
+    assert passed == [True, False, True, True, False]
+
+
+def test_on_change_after_where():
+    changes = MessageFilter(where="mode > 0", on_change=["mode"])
+    assert changes.apply(message(mode=1)) is not None
+    assert changes.apply(message(mode=0)) is None
+    assert changes.apply(message(mode=1)) is None
+
+
+def test_fields():
+    projection = MessageFilter(fields=["mode", "imu_state.rpy"])
+    projected = projection.apply(message(mode=3, imu_state={"rpy": [1, 2, 3]}, extra=1))
+    assert projected == {"type": "msg", "topic": "rt/test", "data": {"mode": 3, "imu_state.rpy": [1, 2, 3]}}
+
+
+def test_invalid_and_inactive():
+    with pytest.raises(ValueError):
+        MessageFilter(where="soc <")
+    with pytest.raises(ValueError):
+        MessageFilter(where="soc < twenty")
+    assert not MessageFilter().active
+
+
+def test_subscription_filters_before_queueing():
+    async def main():
+        delivered = []
+        subscription = Subscription("rt/test", delivered.append,
+                                    message_filter=MessageFilter(fields=["mode"], on_change=["mode"]))
+        for mode in (1, 1, 2):
+            subscription.offer(message(mode=mode, extra=True))
+        await subscription.queue.join()
+
+        assert [projected["data"] for projected in delivered] == [{"mode": 1}, {"mode": 2}]
+        assert subscription.stats()["filtered"] == 1
+        subscription.cancel()
+
+    asyncio.run(main())
@@ -0,0 +1,78 @@
+import os
+import stat
+
+import pytest
+
+wasmtime = pytest.importorskip("wasmtime")
+
+from go2_webrtc_driver.lidar import lidar_decoder
+from go2_webrtc_driver.lidar.lidar_decoder import load_module
+
+
+@pytest.fixture
+def cache_dir(tmp_path, monkeypatch):
+    path = tmp_path / "cache"
+    monkeypatch.setenv("GO2_WASM_CACHE_DIR", str(path))
+    return path
+
+
+@pytest.fixture
+def deserialized(monkeypatch):
+    calls = []
+    original = wasmtime.Module.deserialize
+
+    def deserialize(engine, serialized):
+        calls.append(len(serialized))
+        return original(engine, serialized)
+    monkeypatch.setattr(wasmtime.Module, "deserialize", staticmethod(deserialize))
+    return calls
+
+
+def cached_module(cache_dir):
+    (path,) = cache_dir.glob("*.cwasm")
+    return path
+
+
+def test_cache_is_private_and_reused(cache_dir, deserialized):
+    engine = wasmtime.Engine()
+    load_module(engine)
+    path = cached_module(cache_dir)
+    assert stat.S_IMODE(os.stat(cache_dir).st_mode) == 0o700
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o600
+    assert os.path.exists(f"{path}.sha256")
+
+    load_module(engine)
+    assert len(deserialized) == 1
+
+
+def test_modified_module_is_not_deserialized(cache_dir, deserialized):
+    engine = wasmtime.Engine()
+    load_module(engine)
+    path = cached_module(cache_dir)
+    original = path.read_bytes()
+    path.write_bytes(original[:-1] + bytes([original[-1] ^ 1]))
+
+    load_module(engine)
+    assert deserialized == []
+    # Replaced by a freshly compiled module with a matching digest
+    load_module(engine)
+    assert len(deserialized) == 1
+
+
+def test_module_without_digest_is_not_deserialized(cache_dir, deserialized):
+    engine = wasmtime.Engine()
+    load_module(engine)
+    os.remove(f"{cached_module(cache_dir)}.sha256")
+    load_module(engine)
+    assert deserialized == []
+
+
+@pytest.mark.skipif(not hasattr(os, "getuid"), reason="POSIX permissions")
+def test_cache_writable_by_others_is_not_used(cache_dir, deserialized):
+    os.makedirs(cache_dir)
+    os.chmod(cache_dir, 0o777)
+    engine = wasmtime.Engine()
+    load_module(engine)
+    load_module(engine)
+    assert deserialized == [] and not list(cache_dir.glob("*.cwasm"))
+    assert not lidar_decoder.private_cache_dir(str(cache_dir))
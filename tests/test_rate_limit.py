@@ -0,0 +1,60 @@
+import asyncio
+import time
+
+import pytest
+
+from go2_webrtc_driver.msgs.rate_limit import RateLimit
+from go2_webrtc_driver.msgs.subscription import Subscription
+
+
+def test_max_hz():
+    limit = RateLimit(max_hz=10)
+    accepted = [now for now in (0.0, 0.05, 0.1, 0.12, 0.25) if limit.accept(now)]
+    assert accepted == [0.0, 0.1, 0.25]
+
+
+def test_every_nth():
+    limit = RateLimit(every_nth=3)
+    assert [limit.accept(0.0) for _ in range(7)] == [True, False, False, True, False, False, True]
+
+
+def test_combined():
+    limit = RateLimit(max_hz=1, every_nth=2)
+    assert [limit.accept(now) for now in (0.0, 0.5, 0.6, 1.0, 1.1)] == [True, False, False, False, True]
+
+
+def test_bucket_end_and_active():
+    limit = RateLimit(bucket=0.5)
+    assert limit.active
+    assert limit.bucket_end(1.2) == pytest.approx(1.5)
+    assert limit.bucket_end(1.5) == pytest.approx(2.0)
+    assert not RateLimit().active
+
+
+def test_invalid():
+    with pytest.raises(ValueError):
+        RateLimit(max_hz=0)
+    with pytest.raises(ValueError):
+        RateLimit(bucket=-1)
+
+
+def test_subscription_bucket_dispatches_the_last_raw_message():
+    async def main():
+        delivered = []
+        subscription = Subscription("topic", delivered.append, rate_limit=RateLimit(bucket=0.05))
+        dispatched = []
+
+        async def dispatch(raw, target, received):
+            dispatched.append((raw, received))
+            target.offer({"raw": raw}, received)
+
+        now = time.monotonic()
+        assert not any(subscription.admit(now, raw, dispatch) for raw in ("a", "b", "c"))
+        await asyncio.sleep(0.1)
+
+        assert dispatched == [("c", now)]
+        assert delivered == [{"raw": "c"}]
+        assert subscription.stats()["rate_limited"] == 2
+        subscription.cancel()
+
+    asyncio.run(main())
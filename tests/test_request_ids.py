@@ -0,0 +1,100 @@
+import asyncio
+import json
+
+import pytest
+
+from go2_webrtc_driver.constants import DATA_CHANNEL_TYPE, RTC_TOPIC
+from go2_webrtc_driver.msgs.future_resolver import MAX_REQUEST_ID, FutureResolver
+from go2_webrtc_driver.msgs.pub_sub import WebRTCDataChannelPubSub
+
+
+class FakeChannel:
+    readyState = "open"
+
+    def __init__(self):
+        self.sent = []
+
+    def send(self, message):
+        self.sent.append(json.loads(message))
+
+
+def reply(request, value):
+    """The robot's response to a sent request, echoing its id."""
+    return {
+        "type": DATA_CHANNEL_TYPE["RESPONSE"],
+        "topic": request["topic"],
+        "data": {"header": request["data"]["header"], "data": value},
+    }
+
+
+def request_id(request):
+    return request["data"]["header"]["identity"]["id"]
+
+
+async def settle():
+    """Let the request tasks run up to their next wait."""
+    for _ in range(10):
+        await asyncio.sleep(0)
+
+
+def test_ids_are_unique_and_wrap_around():
+    resolver = FutureResolver()
+    ids = [resolver.next_request_id() for _ in range(1000)]
+    assert len(set(ids)) == len(ids)
+    assert all(1 <= identifier <= MAX_REQUEST_ID for identifier in ids)
+
+    resolver.last_request_id = MAX_REQUEST_ID - 1
+    assert [resolver.next_request_id() for _ in range(2)] == [MAX_REQUEST_ID, 1]
+
+
+def test_ids_of_pending_requests_are_skipped():
+    resolver = FutureResolver()
+    resolver.last_request_id = 10
+    resolver.pending_callbacks[11] = []
+    resolver.pending_callbacks[12] = []
+    assert resolver.next_request_id() == 13
+
+
+def test_request_many_matches_each_reply_to_its_request():
+    async def main():
+        channel = FakeChannel()
+        pub_sub = WebRTCDataChannelPubSub(channel)
+        requests = [(RTC_TOPIC["SPORT_MOD"], {"api_id": 1016}) for _ in range(5)]
+        responses = asyncio.ensure_future(pub_sub.request_many(requests, timeout=1))
+        await settle()
+
+        assert len({request_id(request) for request in channel.sent}) == 5
+        # Answered in reverse order, all on the same topic and api_id
+        for index, request in reversed(list(enumerate(channel.sent))):
+            pub_sub.run_resolve(reply(request, index))
+        results = await responses
+        assert [result["data"]["data"] for result in results] == list(range(5))
+
+    asyncio.run(main())
+
+
+def test_request_many_limits_requests_in_flight():
+    async def main():
+        channel = FakeChannel()
+        pub_sub = WebRTCDataChannelPubSub(channel)
+        requests = [(RTC_TOPIC["SPORT_MOD"], {"api_id": 1016}) for _ in range(3)]
+        responses = asyncio.ensure_future(pub_sub.request_many(requests, timeout=1, limit=1))
+        for index in range(3):
+            await settle()
+            assert len(channel.sent) == index + 1
+            pub_sub.run_resolve(reply(channel.sent[index], index))
+        assert [result["data"]["data"] for result in await responses] == [0, 1, 2]
+
+    asyncio.run(main())
+
+
+def test_request_many_returns_timeouts():
+    async def main():
+        pub_sub = WebRTCDataChannelPubSub(FakeChannel())
+        requests = [(RTC_TOPIC["SPORT_MOD"], {"api_id": 1016})]
+        results = await pub_sub.request_many(requests, timeout=0.05)
+        assert isinstance(results[0], asyncio.TimeoutError)
+        with pytest.raises(asyncio.TimeoutError):
+            await pub_sub.request_many(requests, timeout=0.05, return_exceptions=False)
+
+    asyncio.run(main())
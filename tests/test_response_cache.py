@@ -0,0 +1,82 @@
+import asyncio
+
+from go2_webrtc_driver.msgs.response_cache import ResponseCache
+
+
+def response(value, code=0):
+    return {"data": {"header": {"status": {"code": code}}, "data": value}}
+
+
+class Requests:
+    def __init__(self, code=0, delay=0.01):
+        self.sent = 0
+        self.code = code
+        self.delay = delay
+
+    async def __call__(self):
+        self.sent += 1
+        await asyncio.sleep(self.delay)
+        return response(self.sent, self.code)
+
+
+def test_concurrent_requests_are_coalesced():
+    async def main():
+        cache = ResponseCache()
+        request = Requests()
+        results = await asyncio.gather(*(cache.fetch("key", 1.0, request) for _ in range(5)))
+        assert request.sent == 1
+        assert all(result is results[0] for result in results)
+        assert cache.stats()["coalesced"] == 4 and cache.stats()["misses"] == 1
+
+        assert await cache.fetch("key", 1.0, request) is results[0]
+        assert cache.stats()["hits"] == 1
+
+    asyncio.run(main())
+
+
+def test_entries_expire():
+    async def main():
+        cache = ResponseCache()
+        request = Requests(delay=0)
+        await cache.fetch("key", 0.02, request)
+        await asyncio.sleep(0.03)
+        await cache.fetch("key", 0.02, request)
+        assert request.sent == 2
+
+    asyncio.run(main())
+
+
+def test_failed_responses_are_not_cached():
+    async def main():
+        cache = ResponseCache()
+        request = Requests(code=1, delay=0)
+        await cache.fetch("key", 1.0, request)
+        await cache.fetch("key", 1.0, request)
+        assert request.sent == 2 and cache.stats()["entries"] == 0
+
+    asyncio.run(main())
+
+
+def test_cancelled_caller_does_not_cancel_the_shared_request():
+    async def main():
+        cache = ResponseCache()
+        request = Requests(delay=0.02)
+        first = asyncio.ensure_future(cache.fetch("key", 1.0, request))
+        second = asyncio.ensure_future(cache.fetch("key", 1.0, request))
+        await asyncio.sleep(0)
+        first.cancel()
+        assert (await second)["data"]["data"] == 1
+        assert request.sent == 1
+
+    asyncio.run(main())
+
+
+def test_least_recently_used_are_evicted():
+    async def main():
+        cache = ResponseCache(max_entries=2)
+        for key in ("a", "b", "c"):
+            await cache.fetch(key, 1.0, Requests(delay=0))
+        assert list(cache.entries) == ["b", "c"]
+        assert cache.stats()["evicted"] == 1
+
+    asyncio.run(main())
@@ -0,0 +1,103 @@
+import asyncio
+import json
+
+import pytest
+
+from go2_webrtc_driver.constants import DATA_CHANNEL_TYPE, RTC_TOPIC
+from go2_webrtc_driver.msgs.pub_sub import WebRTCDataChannelPubSub
+
+state_types = pytest.importorskip("go2_webrtc_driver.msgs.state_types")
+
+LOW_STATE = {
+    "type": DATA_CHANNEL_TYPE["MSG"],
+    "topic": RTC_TOPIC["LOW_STATE"],
+    "data": {
+        "imu_state": {"rpy": [0.01, -0.02, 0.03]},
+        "motor_state": [{"q": 0.5 * index, "temperature": 30 + index, "lost": 0, "reserve": [0, 1]} for index in range(4)],
+        "bms_state": {"soc": 80, "current": -1200, "bq_ntc": [30, 31]},
+        "foot_force": [10, 20, 30, 40],
+        "power_v": 31.5,
+        "unknown_field": "ignored",
+    },
+}
+
+
+class FakeChannel:
+    readyState = "open"
+
+    def __init__(self):
+        self.sent = []
+
+    def send(self, message):
+        self.sent.append(message)
+
+
+def test_raw_decoder_matches_converted_dict():
+    raw = json.dumps(LOW_STATE)
+    message = state_types.message_decoder(RTC_TOPIC["LOW_STATE"])(raw)
+    assert message["type"] == LOW_STATE["type"] and message["topic"] == LOW_STATE["topic"]
+
+    state = message["data"]
+    assert isinstance(state, state_types.LowState)
+    assert state == state_types.msgspec.convert(LOW_STATE["data"], state_types.LowState)
+    assert state.bms_state.soc == 80
+    assert state.imu_state.rpy == (0.01, -0.02, 0.03)
+    assert state.temperature_ntc1 is None
+    assert state.motor_array()["q"].tolist() == [0.0, 0.5, 1.0, 1.5]
+
+
+def test_typed_callback_converts_dicts_and_passes_typed_states_through():
+    received = []
+    deliver = state_types.typed_callback(RTC_TOPIC["LOW_STATE"], received.append)
+    deliver(LOW_STATE)
+    typed = state_types.message_decoder(RTC_TOPIC["LOW_STATE"])(json.dumps(LOW_STATE))
+    deliver(typed)
+
+    assert isinstance(received[0]["data"], state_types.LowState)
+    assert received[0]["data"] == typed["data"]
+    assert received[1] is typed
+    # The shared dict message is not modified
+    assert isinstance(LOW_STATE["data"], dict)
+
+
+def test_no_typed_decoder_for_other_topics():
+    with pytest.raises(ValueError):
+        state_types.message_decoder(RTC_TOPIC["ULIDAR_ARRAY"])
+
+
+def test_raw_decoder_only_when_every_subscriber_is_typed():
+    async def main():
+        pub_sub = WebRTCDataChannelPubSub(FakeChannel())
+        topic = RTC_TOPIC["LOW_STATE"]
+        typed = pub_sub.subscribe(topic, lambda message: None, typed=True)
+        assert pub_sub.raw_decoder(DATA_CHANNEL_TYPE["MSG"], topic, (typed,)) is not None
+
+        plain = pub_sub.subscribe(topic, lambda message: None)
+        assert pub_sub.raw_decoder(DATA_CHANNEL_TYPE["MSG"], topic, (typed, plain)) is None
+        pub_sub.unsubscribe(topic)
+
+    asyncio.run(main())
+
+
+def test_latest_cache_keeps_dicts_for_typed_messages():
+    async def main():
+        pub_sub = WebRTCDataChannelPubSub(FakeChannel())
+        topic = RTC_TOPIC["LOW_STATE"]
+        delivered = []
+        subscription = pub_sub.subscribe(topic, delivered.append, typed=True)
+
+        raw = json.dumps(LOW_STATE)
+        decoder = pub_sub.raw_decoder(DATA_CHANNEL_TYPE["MSG"], topic, (subscription,))
+        pub_sub.run_resolve(decoder(raw), (subscription,), raw=raw)
+        await asyncio.sleep(0)
+
+        assert isinstance(delivered[0]["data"], state_types.LowState)
+        assert pub_sub.get_latest(topic).message == LOW_STATE
+        assert pub_sub.snapshot([topic])[topic].message == LOW_STATE
+
+        pub_sub.run_resolve(decoder(raw), (subscription,), raw=raw)
+        latest = pub_sub.snapshot()[topic]
+        assert latest.message == LOW_STATE and latest.sequence == 1
+        pub_sub.unsubscribe(topic)
+
+    asyncio.run(main())
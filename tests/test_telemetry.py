@@ -0,0 +1,135 @@
+import asyncio
+import json
+
+import numpy as np
+import pytest
+
+from go2_webrtc_driver.constants import DATA_CHANNEL_TYPE, RTC_TOPIC
+from go2_webrtc_driver.msgs.latest_only import LatestOnlyDelivery
+from go2_webrtc_driver.msgs.pub_sub import WebRTCDataChannelPubSub
+from go2_webrtc_driver.msgs.telemetry import RingBuffer, TelemetryStore
+
+TOPIC = RTC_TOPIC["LF_SPORT_MOD_STATE"]
+
+
+class FakeChannel:
+    readyState = "open"
+
+    def __init__(self):
+        self.sent = []
+
+    def send(self, message):
+        self.sent.append(message)
+
+
+def sportmodestate(index):
+    return {
+        "type": DATA_CHANNEL_TYPE["MSG"],
+        "topic": TOPIC,
+        "data": {
+            "position": [index, 0.0, 0.0],
+            "velocity": [0.5, 0.0, 0.0],
+            "yaw_speed": 0.1 * index,
+            "body_height": 0.32,
+            "imu_state": {"rpy": [0.0, 0.0, 0.1], "gyroscope": [0.0, 0.0, 0.0], "accelerometer": [0.0, 0.0, 9.8]},
+            "foot_force": [20, 21, 22, 23],
+        },
+    }
+
+
+def filled(count, capacity=8):
+    buffer = RingBuffer(capacity, (2,))
+    for index in range(count):
+        buffer.append(float(index), [index, -index])
+    return buffer
+
+
+def test_window_before_and_after_wraparound():
+    buffer = filled(5)
+    times, values = buffer.window(1.0, 3.0)
+    assert times.tolist() == [1.0, 2.0, 3.0]
+    assert values[:, 0].tolist() == [1, 2, 3]
+
+    buffer = filled(13)
+    assert len(buffer) == 8
+    assert len(buffer.segments()) == 2
+    times, values = buffer.window(0.0, 100.0)
+    assert times.tolist() == [float(index) for index in range(5, 13)]
+    times, _values = buffer.window(6.5, 9.0)
+    assert times.tolist() == [7.0, 8.0, 9.0]
+    assert buffer.latest()[0] == 12.0
+
+
+def test_interpolate_across_the_wrap_and_clamp():
+    buffer = filled(11)
+    assert buffer.interpolate(7.25).tolist() == [7.25, -7.25]
+    assert buffer.interpolate([3.0, 7.5, 20.0])[:, 0].tolist() == [3.0, 7.5, 10.0]
+
+    single = filled(1)
+    assert single.interpolate(5.0).tolist() == [0, 0]
+    with pytest.raises(ValueError):
+        RingBuffer(4).interpolate(1.0)
+
+
+def test_timestamps_must_not_decrease():
+    buffer = filled(3)
+    with pytest.raises(ValueError):
+        buffer.append(1.0, [0, 0])
+
+
+def test_store_records_dicts_with_the_receive_time():
+    store = TelemetryStore(capacity=16)
+    store.add_topic(TOPIC)
+    for index in range(4):
+        store.record(sportmodestate(index), timestamp=10.0 + index)
+    times, position = store.window(TOPIC, "position", 11.0, 12.0)
+    assert times.tolist() == [11.0, 12.0]
+    assert position[:, 0].tolist() == [1.0, 2.0]
+    assert store.at(TOPIC, "yaw_speed", 12.5) == pytest.approx(0.25)
+
+
+def test_typed_timestamped_subscriptions():
+    pytest.importorskip("msgspec")
+
+    async def main():
+        pub_sub = WebRTCDataChannelPubSub(FakeChannel())
+        store = TelemetryStore(capacity=16)
+        store.attach(pub_sub, TOPIC, typed=True)
+        received = []
+        pub_sub.subscribe(TOPIC, lambda message, stamp: received.append((message, stamp)), typed=True, timestamped=True)
+
+        for index in range(3):
+            pub_sub.run_resolve(sportmodestate(index), received=20.0 + index)
+        await asyncio.sleep(0.01)
+
+        assert [stamp for _message, stamp in received] == [20.0, 21.0, 22.0]
+        assert received[0][0]["data"].position == (0.0, 0.0, 0.0)
+        assert store.errors == 0
+        times, position = store.window(TOPIC, "position", 0.0, 100.0)
+        assert times.tolist() == [20.0, 21.0, 22.0]
+        assert position[:, 0].tolist() == [0.0, 1.0, 2.0]
+        pub_sub.unsubscribe(TOPIC)
+
+    asyncio.run(main())
+
+
+def test_typed_timestamped_latest_only():
+    pytest.importorskip("msgspec")
+
+    async def main():
+        pub_sub = WebRTCDataChannelPubSub(FakeChannel())
+        received = []
+        delivery = pub_sub.subscribe(TOPIC, lambda message, stamp: received.append((message, stamp)),
+                                     latest_only=True, typed=True, timestamped=True)
+        assert isinstance(delivery, LatestOnlyDelivery)
+        raw = json.dumps(sportmodestate(5))
+        delivery.offer(raw, json.loads, 30.0)
+        await asyncio.sleep(0.01)
+
+        (message, stamp), = received
+        assert stamp == 30.0
+        assert message["data"].position == (5.0, 0.0, 0.0)
+        assert np.isclose(message["data"].yaw_speed, 0.5)
+        pub_sub.unsubscribe(TOPIC)
+
+    asyncio.run(main())
@@ -0,0 +1,84 @@
+import asyncio
+
+import pytest
+
+from go2_webrtc_driver.constants import RTC_TOPIC
+from go2_webrtc_driver.msgs.pub_sub import WebRTCDataChannelPubSub
+from go2_webrtc_driver.msgs.timer_wheel import TimerWheel
+
+
+class FakeChannel:
+    readyState = "open"
+
+    def __init__(self):
+        self.sent = []
+
+    def send(self, message):
+        self.sent.append(message)
+
+
+def test_deadlines_expire_in_order():
+    async def main():
+        loop = asyncio.get_event_loop()
+        wheel = TimerWheel(tick=0.01, slots=8)
+        fired = []
+        now = loop.time()
+        wheel.schedule("late", now + 0.05, lambda: fired.append(("late", loop.time())))
+        wheel.schedule("early", now + 0.02, lambda: fired.append(("early", loop.time())))
+        # Further away than one turn of the wheel
+        wheel.schedule("turn", now + 0.12, lambda: fired.append(("turn", loop.time())))
+        assert len(wheel) == 3
+
+        await asyncio.sleep(0.2)
+        assert [key for key, _ in fired] == ["early", "late", "turn"]
+        deadlines = {"early": now + 0.02, "late": now + 0.05, "turn": now + 0.12}
+        for key, fired_at in fired:
+            assert fired_at >= deadlines[key]
+        assert len(wheel) == 0 and wheel.handle is None
+
+    asyncio.run(main())
+
+
+def test_cancel_and_reschedule():
+    async def main():
+        loop = asyncio.get_event_loop()
+        wheel = TimerWheel(tick=0.01)
+        fired = []
+        wheel.schedule("cancelled", loop.time() + 0.02, lambda: fired.append("cancelled"))
+        wheel.schedule("moved", loop.time() + 0.02, lambda: fired.append("first"))
+        wheel.schedule("moved", loop.time() + 0.05, lambda: fired.append("moved"))
+        wheel.cancel("cancelled")
+        assert "cancelled" not in wheel
+        assert wheel.deadline("moved") is not None
+
+        await asyncio.sleep(0.03)
+        assert fired == []
+        await asyncio.sleep(0.05)
+        assert fired == ["moved"]
+
+    asyncio.run(main())
+
+
+def test_clear():
+    async def main():
+        loop = asyncio.get_event_loop()
+        wheel = TimerWheel(tick=0.01)
+        fired = []
+        wheel.schedule("key", loop.time() + 0.01, lambda: fired.append("key"))
+        wheel.clear()
+        await asyncio.sleep(0.03)
+        assert fired == [] and len(wheel) == 0
+
+    asyncio.run(main())
+
+
+def test_requests_time_out_and_are_forgotten():
+    async def main():
+        pub_sub = WebRTCDataChannelPubSub(FakeChannel())
+        with pytest.raises(asyncio.TimeoutError):
+            await pub_sub.publish_request_new(RTC_TOPIC["SPORT_MOD"], {"api_id": 1016}, timeout=0.05)
+        stats = pub_sub.get_pending_stats()
+        assert stats["timed_out"] == 1
+        assert stats["pending_requests"] == 0 and stats["deadlines"] == 0
+
+    asyncio.run(main())
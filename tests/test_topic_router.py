@@ -0,0 +1,60 @@
+import asyncio
+import json
+
+from go2_webrtc_driver.constants import DATA_CHANNEL_TYPE, RTC_TOPIC
+from go2_webrtc_driver.msgs.pub_sub import WebRTCDataChannelPubSub
+from go2_webrtc_driver.msgs.topic_router import TopicRouter, peek_header
+
+
+class FakeChannel:
+    readyState = "open"
+
+    def __init__(self):
+        self.sent = []
+
+    def send(self, message):
+        self.sent.append(message)
+
+
+def route(router, message):
+    raw = json.dumps(message)
+    return router.route(*peek_header(raw), raw, len(raw))
+
+
+def test_msg_topics_skipped_while_id_keyed_request_pending():
+    async def main():
+        pub_sub = WebRTCDataChannelPubSub(FakeChannel())
+        router = TopicRouter(pub_sub)
+        request = asyncio.ensure_future(pub_sub.publish_request_new(RTC_TOPIC["SPORT_MOD"], {"api_id": 1016}))
+        await asyncio.sleep(0)
+        assert pub_sub.get_pending_stats()["pending_requests"] == 1
+
+        lowstate = {"type": DATA_CHANNEL_TYPE["MSG"], "topic": RTC_TOPIC["LOW_STATE"], "data": {}}
+        assert route(router, lowstate) is None
+        stats = router.stats()
+        assert stats["skipped"] == 1 and stats["decoded"] == 0
+
+        request.cancel()
+        await asyncio.gather(request, return_exceptions=True)
+        assert not pub_sub.future_resolver.pending_topics
+
+    asyncio.run(main())
+
+
+def test_msg_topic_of_pending_request_is_decoded():
+    async def main():
+        pub_sub = WebRTCDataChannelPubSub(FakeChannel())
+        router = TopicRouter(pub_sub)
+        request = asyncio.ensure_future(pub_sub.publish("rt/test", {"header": {"identity": {}}}))
+        await asyncio.sleep(0)
+
+        assert route(router, {"type": DATA_CHANNEL_TYPE["MSG"], "topic": "rt/test", "data": {}}) == ()
+        assert route(router, {"type": DATA_CHANNEL_TYPE["MSG"], "topic": "rt/other", "data": {}}) is None
+        stats = router.stats()
+        assert stats["decoded"] == 1 and stats["skipped"] == 1
+
+        request.cancel()
+        await asyncio.gather(request, return_exceptions=True)
+        assert route(router, {"type": DATA_CHANNEL_TYPE["MSG"], "topic": "rt/test", "data": {}}) is None
+
+    asyncio.run(main())
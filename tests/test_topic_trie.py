@@ -0,0 +1,72 @@
+import asyncio
+
+import pytest
+
+from go2_webrtc_driver.constants import CLIENT_TOPICS, RTC_TOPIC
+from go2_webrtc_driver.msgs.pub_sub import WebRTCDataChannelPubSub
+from go2_webrtc_driver.msgs.topic_trie import TopicTrie, is_pattern, topic_matches
+
+
+class FakeChannel:
+    readyState = "open"
+
+    def __init__(self):
+        self.sent = []
+
+    def send(self, message):
+        self.sent.append(message)
+
+
+def test_single_wildcard_matches_one_segment():
+    assert topic_matches("rt/utlidar/*", "rt/utlidar/voxel_map")
+    assert not topic_matches("rt/utlidar/*", "rt/utlidar")
+    assert not topic_matches("rt/utlidar/*", "rt/utlidar/voxel_map/extra")
+    assert topic_matches("rt/*/sportmodestate", "rt/lf/sportmodestate")
+
+
+def test_multi_wildcard_matches_one_or_more_segments():
+    assert topic_matches("rt/uslam/**", "rt/uslam/cloud_map")
+    assert topic_matches("rt/uslam/**", "rt/uslam/frontend/odom")
+    assert not topic_matches("rt/uslam/**", "rt/uslam")
+    with pytest.raises(ValueError):
+        TopicTrie().insert("rt/**/odom", 1)
+
+
+def test_match_and_remove():
+    trie = TopicTrie()
+    trie.insert("rt/utlidar/*", "one")
+    trie.insert("rt/**", "all")
+    trie.insert("rt/utlidar/voxel_map", "exact")
+    assert sorted(trie.match("rt/utlidar/voxel_map")) == ["all", "exact", "one"]
+    assert trie.match("rt/lf/lowstate") == ["all"]
+
+    trie.remove("rt/utlidar/*", "one")
+    trie.remove("rt/**", "all")
+    assert trie.match("rt/utlidar/voxel_map") == ["exact"]
+    trie.remove("rt/utlidar/voxel_map", "exact")
+    assert trie.root.empty()
+
+
+def test_patterns_expand_to_robot_published_topics():
+    pub_sub = WebRTCDataChannelPubSub(None)
+    assert is_pattern("rt/utlidar/*") and not is_pattern("rt/utlidar/voxel_map")
+    topics = pub_sub.robot_topics("rt/utlidar/*")
+    assert RTC_TOPIC["ULIDAR_ARRAY"] in topics
+    assert RTC_TOPIC["ULIDAR_SWITCH"] not in topics
+    assert not CLIENT_TOPICS.intersection(pub_sub.robot_topics("rt/**"))
+    assert pub_sub.robot_topics(RTC_TOPIC["SPORT_MOD"]) == [RTC_TOPIC["SPORT_MOD"]]
+
+
+def test_pattern_subscriptions_get_matching_topics():
+    async def main():
+        pub_sub = WebRTCDataChannelPubSub(FakeChannel())
+        pattern = pub_sub.subscribe("rt/utlidar/*", lambda message: None)
+        exact = pub_sub.subscribe(RTC_TOPIC["ULIDAR_ARRAY"], lambda message: None)
+        assert set(pub_sub.subscriptions_for(RTC_TOPIC["ULIDAR_ARRAY"])) == {pattern, exact}
+        assert pub_sub.subscriptions_for(RTC_TOPIC["LOW_STATE"]) == ()
+
+        pub_sub.unsubscribe("rt/utlidar/*", pattern)
+        assert pub_sub.subscriptions_for(RTC_TOPIC["ULIDAR_ARRAY"]) == (exact,)
+        pub_sub.unsubscribe(RTC_TOPIC["ULIDAR_ARRAY"])
+
+    asyncio.run(main())
@@ -0,0 +1,138 @@
+import asyncio
+
+import numpy as np
+
+from go2_webrtc_driver.lidar.voxel_delta import VoxelDeltaDecoder, VoxelDeltaEncoder, VoxelDeltaStage
+from go2_webrtc_driver.lidar.voxel_map import grid_index
+from go2_webrtc_driver.msgs.latest_only import LatestOnlyDelivery
+from go2_webrtc_driver.msgs.rate_limit import RateLimit
+from go2_webrtc_driver.msgs.subscription import Subscription
+
+RESOLUTION = 0.05
+TOPIC = "rt/utlidar/voxel_map_compressed"
+
+
+def world_voxels(count=200, seed=0):
+    """Occupied voxels of a static scene, as global voxel indices."""
+    rng = np.random.default_rng(seed)
+    return np.unique(rng.integers(-40, 40, size=(count, 3)), axis=0)
+
+
+def frame(scene, origin):
+    """The scene seen from a frame window at `origin`: frame voxel coordinates."""
+    return scene - grid_index(origin, RESOLUTION)
+
+
+def as_set(voxels):
+    return set(map(tuple, np.asarray(voxels).tolist()))
+
+
+def lidar_message(index, scene):
+    origin = [-3.2 + index * RESOLUTION, -3.2, -0.575]
+    return {
+        "type": "msg",
+        "topic": TOPIC,
+        "data": {"origin": origin, "resolution": RESOLUTION, "data": {"voxels": frame(scene, origin)}},
+    }
+
+
+def test_moving_off_grid_origin_is_not_a_change():
+    scene = world_voxels()
+    encoder = VoxelDeltaEncoder(keyframe_interval=0)
+    # Half-voxel z origin, as sent by the robot, and x moving by fractions of a voxel
+    for step, x in enumerate(np.arange(-3.2, -2.0, 0.0175)):
+        origin = [x, -3.2, -0.575]
+        delta = encoder.update(frame(scene, origin), origin, RESOLUTION)
+        if step:
+            assert not delta["keyframe"]
+            assert len(delta["added"]) == 0 and len(delta["removed"]) == 0
+
+
+def test_sequence_and_keyframes():
+    scene = world_voxels()
+    encoder = VoxelDeltaEncoder(keyframe_interval=3)
+    keyframes = [encoder.update(scene, [0, 0, 0], RESOLUTION)["keyframe"] for _ in range(7)]
+    assert keyframes == [True, False, False, True, False, False, True]
+    assert encoder.sequence == 6
+
+    encoder.request_keyframe()
+    assert encoder.update(scene, [0, 0, 0], RESOLUTION)["keyframe"]
+    assert encoder.update(scene, [0, 0, 0], 0.1)["keyframe"]
+
+
+def test_decoder_follows_changes_and_waits_after_a_gap():
+    encoder = VoxelDeltaEncoder(keyframe_interval=5)
+    decoder = VoxelDeltaDecoder()
+    frames = [world_voxels(seed=seed) for seed in range(6)]
+    deltas = [encoder.update(voxels, [0, 0, 0], RESOLUTION) for voxels in frames]
+
+    for voxels, delta in zip(frames[:3], deltas[:3]):
+        assert as_set(decoder.apply(delta)) == as_set(voxels)
+    # deltas[3] is lost: the stream resumes at the next keyframe
+    assert decoder.apply(deltas[4]) is None
+    assert decoder.gaps == 1
+    assert deltas[5]["keyframe"]
+    assert as_set(decoder.apply(deltas[5])) == as_set(frames[5])
+
+
+def test_stage_leaves_shared_messages_alone():
+    scene = world_voxels()
+    message = lidar_message(0, scene)
+    first = VoxelDeltaStage().apply(message)
+    second = VoxelDeltaStage().apply(message)
+    assert first["data"]["data"]["keyframe"] and second["data"]["data"]["keyframe"]
+    assert "voxels" in message["data"]["data"]
+    # Messages without voxels are delivered as they are
+    state = {"type": "msg", "topic": "rt/lf/lowstate", "data": {"mode": 1}}
+    assert VoxelDeltaStage().apply(state) is state
+
+
+def test_rate_limited_subscriber_gets_a_consistent_stream():
+    scenes = [world_voxels(seed=seed) for seed in range(12)]
+
+    async def main():
+        decoder = VoxelDeltaDecoder()
+        rebuilt = []
+        subscription = Subscription(TOPIC, lambda message: rebuilt.append(decoder.apply(message["data"]["data"])),
+                                    rate_limit=RateLimit(every_nth=3))
+        subscription.voxel_delta = VoxelDeltaStage(keyframe_interval=100)
+        for index, scene in enumerate(scenes):
+            message = lidar_message(index, scene)
+            if subscription.admit(0, message):
+                subscription.offer(message)
+            await asyncio.sleep(0)
+        await subscription.queue.join()
+        subscription.cancel()
+        return rebuilt
+
+    rebuilt = asyncio.run(main())
+    assert len(rebuilt) == 4
+    assert all(voxels is not None for voxels in rebuilt)
+    for voxels, scene in zip(rebuilt, scenes[::3]):
+        assert as_set(voxels) == as_set(scene)
+
+
+def test_latest_only_subscriber_gets_a_consistent_stream():
+    scenes = [world_voxels(seed=seed) for seed in range(10)]
+
+    async def main():
+        decoder = VoxelDeltaDecoder()
+        rebuilt = []
+        delivery = LatestOnlyDelivery(TOPIC, lambda message: rebuilt.append(
+            (message["data"]["origin"], decoder.apply(message["data"]["data"]))
+        ))
+        delivery.voxel_delta = VoxelDeltaStage(keyframe_interval=100)
+        for index, scene in enumerate(scenes):
+            delivery.offer(lidar_message(index, scene))
+            if index % 3 == 0:
+                await asyncio.sleep(0.01)
+        await asyncio.sleep(0.01)
+        delivery.cancel()
+        return delivery.stats(), rebuilt
+
+    stats, rebuilt = asyncio.run(main())
+    assert stats["dropped"] > 0
+    assert all(voxels is not None for _origin, voxels in rebuilt)
+    for origin, voxels in rebuilt:
+        index = round((origin[0] + 3.2) / RESOLUTION)
+        assert as_set(voxels) == as_set(scenes[index])
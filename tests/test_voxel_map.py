@@ -0,0 +1,83 @@
+import numpy as np
+import pytest
+
+from go2_webrtc_driver.lidar.voxel_map import VoxelOccupancyMap, grid_index
+
+RESOLUTION = 0.05
+ORIGIN = [-3.2, -3.2, -0.575]
+
+
+def test_grid_index_floors_and_absorbs_rounding():
+    assert grid_index([-0.575], RESOLUTION).tolist() == [-12]
+    assert grid_index([0.15], RESOLUTION).tolist() == [3]
+    # 0.15 / 0.05 is a hair below 3 in floating point
+    assert grid_index([0.15 - 1e-12], RESOLUTION).tolist() == [3]
+    assert grid_index([0.149], RESOLUTION).tolist() == [2]
+
+
+def test_integrate_and_query():
+    voxel_map = VoxelOccupancyMap()
+    voxel_map.integrate([[0, 0, 0], [10, 20, 5]], ORIGIN, RESOLUTION)
+
+    base = grid_index(ORIGIN, RESOLUTION)
+    point = (base + [10, 20, 5] + 0.5) * RESOLUTION
+    assert voxel_map.is_occupied(*point)
+    assert voxel_map.is_occupied_index(*(base + [0, 0, 0]).tolist())
+    assert not voxel_map.is_occupied(*(point + RESOLUTION))
+
+    occupied = voxel_map.query([point, point + RESOLUTION, (base + 0.5) * RESOLUTION])
+    assert occupied.tolist() == [True, False, True]
+    assert sorted(voxel_map.occupied_voxels().tolist()) == sorted([base.tolist(), (base + [10, 20, 5]).tolist()])
+
+
+def test_frame_replaces_its_window_only():
+    voxel_map = VoxelOccupancyMap()
+    voxel_map.integrate([[5, 5, 5]], [0, 0, 0], RESOLUTION, window=(10, 10, 10))
+    voxel_map.integrate([[0, 0, 0]], [1.0, 0, 0], RESOLUTION, window=(10, 10, 10))
+    # Outside of the second window: kept
+    assert voxel_map.is_occupied_index(5, 5, 5)
+
+    voxel_map.integrate([[1, 1, 1]], [0, 0, 0], RESOLUTION, window=(10, 10, 10))
+    assert not voxel_map.is_occupied_index(5, 5, 5)
+    assert voxel_map.is_occupied_index(1, 1, 1)
+    assert voxel_map.is_occupied_index(20, 0, 0)
+
+
+def test_clear_box_drops_empty_chunks():
+    voxel_map = VoxelOccupancyMap(chunk_size=4)
+    voxel_map.integrate([[1, 1, 1], [6, 1, 1]], [0, 0, 0], RESOLUTION, window=(8, 4, 4))
+    assert len(voxel_map.chunks) == 2
+
+    voxel_map.clear_box(np.array([0, 0, 0]), np.array([2, 2, 2]))
+    assert not voxel_map.is_occupied_index(1, 1, 1)
+    assert voxel_map.is_occupied_index(6, 1, 1)
+    assert list(voxel_map.chunks) == [(1, 0, 0)]
+
+
+def test_eviction_keeps_chunks_near_the_last_frame():
+    voxel_map = VoxelOccupancyMap(chunk_size=4, max_chunks=2)
+    window = (4, 4, 4)
+    for x in range(4):
+        voxel_map.integrate([[0, 0, 0]], [x * 4 * RESOLUTION, 0, 0], RESOLUTION, window=window)
+
+    assert voxel_map.stats()["chunks"] == 2
+    assert voxel_map.stats()["evicted"] == 2
+    assert set(voxel_map.chunks) == {(2, 0, 0), (3, 0, 0)}
+
+
+def test_resolution_mismatch_raises():
+    voxel_map = VoxelOccupancyMap()
+    voxel_map.integrate([], ORIGIN, RESOLUTION)
+    with pytest.raises(ValueError):
+        voxel_map.integrate([], ORIGIN, 0.1)
+
+
+def test_clear_resets_the_map():
+    voxel_map = VoxelOccupancyMap()
+    voxel_map.integrate([[0, 0, 0]], ORIGIN, RESOLUTION)
+    voxel_map.clear()
+    assert voxel_map.stats() == {"frames": 0, "chunks": 0, "evicted": 0, "bytes": 0}
+    assert not voxel_map.is_occupied(*ORIGIN)
+    # A new resolution is accepted after clear()
+    voxel_map.integrate([[0, 0, 0]], ORIGIN, 0.1)
+    assert voxel_map.resolution == 0.1